@@ -4,28 +4,87 @@ Demonstrates how to connect and use WaddleAI via MCP protocol
 """
 
 import asyncio
-import json
+import itertools
+import socket
+import orjson
 import websockets
-from typing import Dict, Any, Optional
+from websockets.extensions.permessage_deflate import ClientPerMessageDeflateFactory
+from typing import Callable, Dict, Any, Optional
 
 
 class WaddleAIMCPClient:
     """MCP client for WaddleAI"""
     
+    # Pre-serialized JSON-RPC envelopes; each request only appends its id
+    # (and params, where they vary) instead of rebuilding the whole dict
+    _TPL_INITIALIZE = b'{"jsonrpc":"2.0","method":"initialize","params":' + orjson.dumps({
+        "protocolVersion": "2024-11-05",
+        "capabilities": {
+            "roots": {
+                "listChanged": True
+            }
+        },
+        "clientInfo": {
+            "name": "WaddleAI Example Client",
+            "version": "1.0.0"
+        }
+    }) + b',"id":'
+    _TPL_LIST_TOOLS = b'{"jsonrpc":"2.0","method":"tools/list","id":'
+    _TPL_CALL_TOOL = b'{"jsonrpc":"2.0","method":"tools/call","id":'
+    _TPL_LIST_RESOURCES = b'{"jsonrpc":"2.0","method":"resources/list","id":'
+    _TPL_READ_RESOURCE = b'{"jsonrpc":"2.0","method":"resources/read","id":'
+    
     def __init__(self, uri: str, api_key: str):
         self.uri = uri
         self.api_key = api_key
         self.websocket = None
-        self.message_id = 0
+        self._next_id = itertools.count(1).__next__
+        
+        # In-flight requests keyed by JSON-RPC id (None for the id-less
+        # auth reply), and serialized frames waiting to be coalesced into a
+        # batch by the writer task
+        self._pending: Dict[Optional[int], asyncio.Future] = {}
+        self._outbox: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._send = None
+        self._recv = None
+        
+        # Per-tool request serializers with the tool name pre-encoded
+        self._tool_serializers: Dict[str, Callable[[int, Dict[str, Any]], bytes]] = {}
     
     async def connect(self):
         """Connect to WaddleAI MCP server"""
         print(f"Connecting to {self.uri}...")
-        self.websocket = await websockets.connect(self.uri)
+        self.websocket = await websockets.connect(
+            self.uri,
+            # JSON listings and completions compress well; a 4 KiB window
+            # keeps per-connection deflate memory small
+            compression=None,
+            extensions=[
+                ClientPerMessageDeflateFactory(
+                    server_max_window_bits=12,
+                    client_max_window_bits=12,
+                    compress_settings={"memLevel": 5}
+                )
+            ],
+            max_size=2**22,
+            # Short-lived sessions gain nothing from keepalive pings; a small
+            # queue bounds buffering if the server bursts responses
+            ping_interval=None,
+            ping_timeout=None,
+            close_timeout=1,
+            max_queue=64
+        )
+        self._set_tcp_nodelay()
+        self._send = self.websocket.send
+        self._recv = self.websocket.recv
+        
+        # All frames from here on are read by the background reader
+        self._start_io()
         
         # Authenticate
-        await self._send_auth()
-        auth_response = await self._receive_message()
+        auth_response = await self._send_auth()
         
         if auth_response.get("result", {}).get("authenticated"):
             print("✓ Authentication successful")
@@ -41,39 +100,30 @@ class WaddleAIMCPClient:
     
     async def disconnect(self):
         """Disconnect from server"""
+        for task in (self._writer_task, self._reader_task):
+            if task:
+                task.cancel()
+        
         if self.websocket:
             await self.websocket.close()
             print("Disconnected from server")
     
-    async def _send_auth(self):
-        """Send authentication message"""
+    async def _send_auth(self) -> Dict[str, Any]:
+        """Send authentication message and wait for the server's reply"""
         auth_message = {
             "api_key": self.api_key
         }
-        await self.websocket.send(json.dumps(auth_message))
+        future = asyncio.get_running_loop().create_future()
+        self._pending[None] = future
+        await self._send(orjson.dumps(auth_message))
+        return await future
     
     async def _initialize(self):
         """Initialize MCP session"""
-        init_message = {
-            "jsonrpc": "2.0",
-            "id": self._next_id(),
-            "method": "initialize",
-            "params": {
-                "protocolVersion": "2024-11-05",
-                "capabilities": {
-                    "roots": {
-                        "listChanged": True
-                    }
-                },
-                "clientInfo": {
-                    "name": "WaddleAI Example Client",
-                    "version": "1.0.0"
-                }
-            }
-        }
-        
-        await self.websocket.send(json.dumps(init_message))
-        response = await self._receive_message()
+        request_id = self._next_id()
+        response = await self._request(
+            request_id, self._TPL_INITIALIZE + str(request_id).encode() + b"}"
+        )
         
         if "result" in response:
             print("✓ MCP session initialized")
@@ -84,57 +134,35 @@ class WaddleAIMCPClient:
     
     async def list_tools(self) -> Dict[str, Any]:
         """List available tools"""
-        message = {
-            "jsonrpc": "2.0",
-            "id": self._next_id(),
-            "method": "tools/list"
-        }
-        
-        await self.websocket.send(json.dumps(message))
-        response = await self._receive_message()
+        request_id = self._next_id()
+        response = await self._request(
+            request_id, self._TPL_LIST_TOOLS + str(request_id).encode() + b"}"
+        )
         return response.get("result", {})
     
     async def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Call a tool"""
-        message = {
-            "jsonrpc": "2.0",
-            "id": self._next_id(),
-            "method": "tools/call",
-            "params": {
-                "name": tool_name,
-                "arguments": arguments
-            }
-        }
-        
-        await self.websocket.send(json.dumps(message))
-        response = await self._receive_message()
+        request_id = self._next_id()
+        serialize = self._tool_serializers.get(tool_name) or self._build_tool_serializer(tool_name)
+        response = await self._request(request_id, serialize(request_id, arguments))
         return response
     
     async def list_resources(self) -> Dict[str, Any]:
         """List available resources"""
-        message = {
-            "jsonrpc": "2.0",
-            "id": self._next_id(),
-            "method": "resources/list"
-        }
-        
-        await self.websocket.send(json.dumps(message))
-        response = await self._receive_message()
+        request_id = self._next_id()
+        response = await self._request(
+            request_id, self._TPL_LIST_RESOURCES + str(request_id).encode() + b"}"
+        )
         return response.get("result", {})
     
     async def read_resource(self, uri: str) -> Dict[str, Any]:
         """Read a resource"""
-        message = {
-            "jsonrpc": "2.0",
-            "id": self._next_id(),
-            "method": "resources/read",
-            "params": {
-                "uri": uri
-            }
-        }
-        
-        await self.websocket.send(json.dumps(message))
-        response = await self._receive_message()
+        request_id = self._next_id()
+        params = orjson.dumps({"uri": uri})
+        response = await self._request(
+            request_id,
+            self._TPL_READ_RESOURCE + str(request_id).encode() + b',"params":' + params + b"}"
+        )
         return response
     
     async def chat(self, messages: list, model: str = "gpt-3.5-turbo", **kwargs) -> str:
@@ -148,24 +176,92 @@ class WaddleAIMCPClient:
         response = await self.call_tool("chat_completion", arguments)
         
         if "result" in response:
-            # Extract response text from MCP result
-            content = response["result"]["content"][0]["text"]
-            result_data = json.loads(content)
-            return result_data["response"]
+            return self.decode_content(response)["response"]
         elif "error" in response:
             raise Exception(f"Chat completion failed: {response['error']['message']}")
         else:
             raise Exception("Unexpected response format")
     
-    def _next_id(self) -> int:
-        """Get next message ID"""
-        self.message_id += 1
-        return self.message_id
+    def _build_tool_serializer(self, tool_name: str) -> Callable[[int, Dict[str, Any]], bytes]:
+        """Build and cache a tools/call serializer specialized for one tool"""
+        head = self._TPL_CALL_TOOL
+        tail = b',"params":{"name":' + orjson.dumps(tool_name) + b',"arguments":'
+        
+        def serialize(request_id: int, arguments: Dict[str, Any], _dumps=orjson.dumps) -> bytes:
+            return head + str(request_id).encode() + tail + _dumps(arguments) + b"}}"
+        
+        self._tool_serializers[tool_name] = serialize
+        return serialize
+    
+    @staticmethod
+    def decode_content(response: Dict[str, Any], field: str = "content") -> Dict[str, Any]:
+        """Decode the JSON payload carried in an MCP result's first text block"""
+        # The server wraps tool/resource payloads in a text field, so the
+        # inner JSON is parsed straight from that string in a single pass
+        return orjson.loads(response["result"][field][0]["text"])
+    
+    def on_notification(self, message: Dict[str, Any]):
+        """Handle a server notification; override to react to them"""
+        pass
+    
+    def _set_tcp_nodelay(self):
+        """Disable Nagle's algorithm so small JSON-RPC frames are not delayed"""
+        sock = self.websocket.transport.get_extra_info("socket")
+        if sock is not None and sock.family in (socket.AF_INET, socket.AF_INET6):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    
+    def _start_io(self):
+        """Start the batching writer and the response reader"""
+        self._outbox = asyncio.Queue()
+        self._writer_task = asyncio.create_task(self._writer_loop())
+        self._reader_task = asyncio.create_task(self._reader_loop())
     
-    async def _receive_message(self) -> Dict[str, Any]:
-        """Receive and parse message"""
-        message = await self.websocket.recv()
-        return json.loads(message)
+    async def _request(self, request_id: int, payload: bytes) -> Dict[str, Any]:
+        """Queue a serialized JSON-RPC request and wait for its response"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        self._outbox.put_nowait(payload)
+        return await future
+    
+    async def _writer_loop(self):
+        """Coalesce concurrently queued requests into JSON-RPC batch frames"""
+        send = self._send
+        outbox = self._outbox
+        while True:
+            # Waiting on the queue gives concurrent callers a loop tick to
+            # enqueue, so everything queued by then goes out in one frame
+            batch = [await outbox.get()]
+            while not outbox.empty():
+                batch.append(outbox.get_nowait())
+            
+            if len(batch) == 1:
+                await send(batch[0])
+            else:
+                await send(b"[" + b",".join(batch) + b"]")
+    
+    async def _reader_loop(self):
+        """Dispatch responses (single or batched) to waiting requests by id"""
+        recv = self._recv
+        pending = self._pending
+        try:
+            while True:
+                data = orjson.loads(await recv())
+                for message in (data if isinstance(data, list) else (data,)):
+                    if "method" in message and "id" not in message:
+                        self.on_notification(message)
+                        continue
+                    
+                    future = pending.pop(message.get("id"), None)
+                    if future is not None and not future.done():
+                        future.set_result(message)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            # Nothing will answer outstanding requests once the reader stops
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("MCP connection closed"))
+            pending.clear()
 
 
 async def demo():
@@ -176,75 +272,100 @@ async def demo():
     
     client = WaddleAIMCPClient(MCP_URI, API_KEY)
     
+    # Report lines are collected and written once rather than per print
+    lines = []
+    out = lines.append
+    
     try:
         # Connect to server
         if not await client.connect():
             return
         
-        print("\n" + "="*50)
-        print("WaddleAI MCP Client Demo")
-        print("="*50)
+        out("\n" + "="*50)
+        out("WaddleAI MCP Client Demo")
+        out("="*50)
+        
+        # Independent requests are issued together so they share one batch;
+        # a failed request is returned as its exception and reported in its
+        # own section instead of aborting the others
+        tools, resources, models_response, usage_response, analytics = await asyncio.gather(
+            client.list_tools(),
+            client.list_resources(),
+            client.call_tool("list_models", {}),
+            client.call_tool("get_usage", {"days": 7}),
+            client.read_resource("waddleai://usage/analytics"),
+            return_exceptions=True
+        )
         
         # List available tools
-        print("\n1. Listing available tools:")
-        tools = await client.list_tools()
-        for tool in tools.get("tools", []):
-            print(f"  • {tool['name']}: {tool['description']}")
+        out("\n1. Listing available tools:")
+        if isinstance(tools, Exception):
+            out(f"  Failed to list tools: {tools}")
+        else:
+            for tool in tools.get("tools", []):
+                out(f"  • {tool['name']}: {tool['description']}")
         
         # List available resources
-        print("\n2. Listing available resources:")
-        resources = await client.list_resources()
-        for resource in resources.get("resources", []):
-            print(f"  • {resource['name']}: {resource['description']}")
+        out("\n2. Listing available resources:")
+        if isinstance(resources, Exception):
+            out(f"  Failed to list resources: {resources}")
+        else:
+            for resource in resources.get("resources", []):
+                out(f"  • {resource['name']}: {resource['description']}")
         
         # Get available models
-        print("\n3. Getting available models:")
-        models_response = await client.call_tool("list_models", {})
-        if "result" in models_response:
-            models_content = json.loads(models_response["result"]["content"][0]["text"])
+        out("\n3. Getting available models:")
+        if isinstance(models_response, Exception):
+            out(f"  Failed to get models: {models_response}")
+        elif "result" in models_response:
+            models_content = client.decode_content(models_response)
             models = models_content.get("models", [])
-            print(f"  Found {len(models)} models:")
+            out(f"  Found {len(models)} models:")
             for model in models[:5]:  # Show first 5
-                print(f"    - {model['id']} ({model['provider']})")
+                out(f"    - {model['id']} ({model['provider']})")
         
         # Get usage statistics
-        print("\n4. Getting usage statistics:")
-        usage_response = await client.call_tool("get_usage", {"days": 7})
-        if "result" in usage_response:
-            usage_content = json.loads(usage_response["result"]["content"][0]["text"])
-            print(f"  Last 7 days: {usage_content['total_tokens']} tokens, {usage_content['total_requests']} requests")
+        out("\n4. Getting usage statistics:")
+        if isinstance(usage_response, Exception):
+            out(f"  Failed to get usage: {usage_response}")
+        elif "result" in usage_response:
+            usage_content = client.decode_content(usage_response)
+            out(f"  Last 7 days: {usage_content['total_tokens']} tokens, {usage_content['total_requests']} requests")
         
         # Test chat completion
-        print("\n5. Testing chat completion:")
+        out("\n5. Testing chat completion:")
         messages = [
             {"role": "user", "content": "Hello! Can you tell me what WaddleAI is?"}
         ]
         
         try:
             response = await client.chat(messages, model="gpt-3.5-turbo")
-            print(f"  AI Response: {response[:200]}{'...' if len(response) > 200 else ''}")
+            out(f"  AI Response: {response[:200]}{'...' if len(response) > 200 else ''}")
         except Exception as e:
-            print(f"  Chat failed: {e}")
+            out(f"  Chat failed: {e}")
         
         # Read usage analytics resource
-        print("\n6. Reading usage analytics resource:")
+        out("\n6. Reading usage analytics resource:")
         try:
-            analytics = await client.read_resource("waddleai://usage/analytics")
+            if isinstance(analytics, Exception):
+                raise analytics
             if "result" in analytics:
-                content = json.loads(analytics["result"]["contents"][0]["text"])
-                print(f"  Analytics period: {content['period']}")
-                print(f"  Total tokens: {content['total_tokens']}")
-                print(f"  Total requests: {content['total_requests']}")
+                content = client.decode_content(analytics, "contents")
+                out(f"  Analytics period: {content['period']}")
+                out(f"  Total tokens: {content['total_tokens']}")
+                out(f"  Total requests: {content['total_requests']}")
         except Exception as e:
-            print(f"  Failed to read analytics: {e}")
+            out(f"  Failed to read analytics: {e}")
         
-        print("\n" + "="*50)
-        print("Demo completed successfully!")
-        print("="*50)
+        out("\n" + "="*50)
+        out("Demo completed successfully!")
+        out("="*50)
         
     except Exception as e:
-        print(f"Demo failed: {e}")
+        out(f"Demo failed: {e}")
     finally:
+        if lines:
+            print("\n".join(lines), flush=True)
         await client.disconnect()
 
 
@@ -5,6 +5,10 @@ Web-based administration portal with RBAC configuration
 
 import sys
 import os
+import asyncio
+import hashlib
+import secrets
+import time
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
 
 from py4web import action, request, response, redirect, URL, Field, abort
@@ -14,19 +18,37 @@ from py4web.utils.auth import Auth
 from py4web.core import Session, Fixture
 import uvicorn
 from fastapi import FastAPI, HTTPException, Request as FastAPIRequest, Depends
-from fastapi.responses import HTMLResponse, JSONResponse, Response
+from fastapi.responses import HTMLResponse, ORJSONResponse, Response, StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 import logging
+import orjson
+import redis.asyncio as redis
 import structlog
 from typing import Optional, Dict, Any, List
 import json
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from contextlib import asynccontextmanager
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
+
+# Optional brotli compression (if available)
+try:
+    from brotli_asgi import BrotliMiddleware
+    HAS_BROTLI = True
+except ImportError:
+    BrotliMiddleware = None
+    HAS_BROTLI = False
 
 from shared.database.models import get_db, init_default_data
-from shared.auth.rbac import RBACManager, AuthenticationError, AuthorizationError, Permission, Role
+from shared.auth.rbac import (
+    RBACManager, AuthenticationError, AuthorizationError, Permission, Role, UserContext,
+    ROLE_PERMISSIONS, ROLE_BY_VALUE
+)
+from shared.auth import jwt_hs256
+from shared.utils.token_manager import summarize_usage
 from shared.utils.llm_connectors import create_llm_connection_manager
 from shared.utils.request_router import create_request_router
 from shared.utils.mcp_interface import create_mcp_server
@@ -36,8 +58,13 @@ from shared.utils.health_checks import WaddleAIHealthMonitor
 # Configure structured logging
 structlog.configure(
     processors=[
+        # Drop events below the configured level before any formatting work
+        structlog.stdlib.filter_by_level,
         structlog.processors.TimeStamper(fmt="ISO"),
-        structlog.processors.JSONRenderer()
+        # orjson returns bytes; the stdlib logger factory expects str
+        structlog.processors.JSONRenderer(
+            serializer=lambda obj, **kwargs: orjson.dumps(obj, **kwargs).decode()
+        )
     ],
     wrapper_class=structlog.stdlib.BoundLogger,
     logger_factory=structlog.stdlib.LoggerFactory(),
@@ -61,8 +88,13 @@ class ManagementServer:
         self.mcp_server = None
         self.mcp_websocket_server = None
         self.health_monitor = None
+        self.redis = None
         self.metrics = management_metrics
         
+        # Set once deferred initialization has completed
+        self.ready = asyncio.Event()
+        self._init_task: Optional[asyncio.Task] = None
+        
         # Configuration
         self.config = {
             'jwt_secret': os.getenv('JWT_SECRET', 'your-secret-key-change-in-production'),
@@ -71,20 +103,46 @@ class ManagementServer:
             'admin_password': os.getenv('ADMIN_PASSWORD', 'admin123'),
             'mcp_host': os.getenv('MCP_HOST', 'localhost'),
             'mcp_port': int(os.getenv('MCP_PORT', '8765')),
-            'mcp_auto_start': os.getenv('MCP_AUTO_START', 'false').lower() == 'true'
+            'mcp_auto_start': os.getenv('MCP_AUTO_START', 'false').lower() == 'true',
+            'ready_timeout': float(os.getenv('READY_TIMEOUT', '30')),
+            'db_pool_size': int(os.getenv('DB_POOL_SIZE', '10')),
+            'auth_cache_ttl': int(os.getenv('AUTH_CACHE_TTL', '60')),
+            'health_cache_ttl': float(os.getenv('HEALTH_CACHE_TTL', '2')),
+            'jwt_cache_ttl': int(os.getenv('JWT_CACHE_TTL', '60')),
+            'metrics_cache_ttl': float(os.getenv('METRICS_CACHE_TTL', '5')),
+            'web_concurrency': int(os.getenv('WEB_CONCURRENCY', '4'))
         }
     
     async def startup(self):
-        """Initialize server components"""
+        """Start server components without delaying port binding"""
         logger.info("Starting WaddleAI Management Server")
         
+        # Heavy initialization runs in the background so uvicorn can start
+        # accepting connections (and answer liveness probes) immediately
+        self._init_task = asyncio.create_task(self._deferred_init())
+    
+    async def _deferred_init(self):
+        """Initialize database, RBAC, LLM connectors and MCP server"""
+        try:
+            await self._initialize_components()
+        except Exception as e:
+            logger.error("Management server initialization failed", error=str(e))
+            return
+        
+        self.ready.set()
+        logger.info("Management server initialized successfully")
+    
+    async def _initialize_components(self):
+        """Initialize server components"""
         # Initialize database
-        self.db = get_db()
-        init_default_data(self.db)
+        self.db = get_db(pool_size=self.config['db_pool_size'])
+        await self._warm_db_pool()
+        await self.db_run(init_default_data, self.db)
         
         # Initialize components
         self.rbac = RBACManager(self.db, self.config['jwt_secret'])
-        self.llm_manager = create_llm_connection_manager(self.db)
+        self.redis = redis.from_url(self.config['redis_url'])
+        self.llm_manager = await self.db_run(create_llm_connection_manager, self.db)
         self.request_router = create_request_router(self.llm_manager, self.db)
         self.mcp_server = create_mcp_server(self.rbac, self.request_router, self.db)
         
@@ -98,22 +156,160 @@ class ManagementServer:
         # Ensure admin user exists
         await self._ensure_admin_user()
         
-        # Auto-start MCP server if configured
-        if self.config['mcp_auto_start']:
+        # Compile page templates before the first render
+        await asyncio.to_thread(self._precompile_templates)
+        
+        # Auto-start MCP server if configured; with several web workers each
+        # would race for the MCP port, so it must run as its own process
+        if self.config['mcp_auto_start'] and self.config['web_concurrency'] > 1:
+            logger.warning("MCP_AUTO_START ignored with multiple web workers; run the MCP server separately")
+        elif self.config['mcp_auto_start']:
             try:
                 await self.start_mcp_server()
             except Exception as e:
-                logger.error(f"Failed to auto-start MCP server: {e}")
+                logger.error("Failed to auto-start MCP server", error=str(e))
+    
+    def _precompile_templates(self):
+        """Load page templates into the environment cache"""
+        for name in ("dashboard.html", "login.html"):
+            try:
+                template_env.get_template(name)
+            except Exception as e:
+                logger.warning("Failed to precompile template", template=name, error=str(e))
+    
+    async def _warm_db_pool(self):
+        """Open pooled database connections before the first requests"""
+        await asyncio.gather(*(
+            asyncio.to_thread(self.db.executesql, "SELECT 1")
+            for _ in range(self.config['db_pool_size'])
+        ))
+    
+    async def db_run(self, fn, *args, **kwargs):
+        """Run blocking DAL work in a worker thread and commit it there"""
+        return await asyncio.to_thread(self._run_in_transaction, fn, args, kwargs)
+    
+    def _run_in_transaction(self, fn, args, kwargs):
+        """Run fn on the calling thread's connection as one transaction"""
+        try:
+            result = fn(*args, **kwargs)
+            self.db.commit()
+            return result
+        except Exception:
+            self.db.rollback()
+            raise
+    
+    async def _get_cached_context(self, key: str) -> Optional[UserContext]:
+        """Load a verified user context shared through Redis"""
+        try:
+            cached = await self.redis.get(key)
+        except Exception as e:
+            logger.warning("Auth cache lookup failed", error=str(e))
+            return None
+        
+        if not cached:
+            return None
+        
+        payload = orjson.loads(cached)
+        role = ROLE_BY_VALUE[payload['role']]
+        return UserContext(
+            user_id=payload['user_id'],
+            username=payload['username'],
+            role=role,
+            organization_id=payload['organization_id'],
+            managed_orgs=frozenset(payload['managed_orgs']),
+            permissions=ROLE_PERMISSIONS.get(role, frozenset()),
+            api_key_id=payload.get('api_key_id')
+        )
+    
+    async def _set_cached_context(self, key: str, user_context: UserContext, ttl: int):
+        """Share a verified user context with other workers for ttl seconds"""
+        if ttl <= 0:
+            return
+        try:
+            await self.redis.setex(key, ttl, orjson.dumps({
+                'user_id': user_context.user_id,
+                'username': user_context.username,
+                'role': user_context.role.value,
+                'organization_id': user_context.organization_id,
+                'managed_orgs': sorted(user_context.managed_orgs),
+                'api_key_id': user_context.api_key_id
+            }))
+        except Exception as e:
+            logger.warning("Auth cache store failed", error=str(e))
+    
+    async def verify_api_key(self, token: str):
+        """Verify an API key, reusing recent results to skip the DB lookup
+        
+        Verified keys are shared through Redis only, not each worker's own
+        RBAC cache, so revoke_api_key takes effect on every worker at once.
+        """
+        key = "apikey:" + hashlib.sha256(token.encode()).hexdigest()
+        
+        user_context = await self._get_cached_context(key)
+        if user_context is not None:
+            await self.rbac.record_api_key_use(user_context.api_key_id, self.db_run)
+            return user_context
+        
+        user_context = await self.rbac.authenticate_api_key_async(token, self.db_run, use_cache=False)
+        if user_context:
+            ttl = self.config['auth_cache_ttl']
+            await self._set_cached_context(key, user_context, ttl)
+            
+            # Revocation only knows the key's id, not the token it was cached under
+            try:
+                await self.redis.setex(f"apikey-id:{user_context.api_key_id}", ttl, key)
+            except Exception as e:
+                logger.warning("Auth cache store failed", error=str(e))
+        return user_context
+    
+    async def revoke_api_key(self, api_key_id: int):
+        """Drop a revoked API key's shared verification from Redis"""
+        index = f"apikey-id:{api_key_id}"
+        key = await self.redis.get(index)
+        await self.redis.delete(index, *([key] if key else []))
+    
+    async def verify_jwt_token(self, token: str):
+        """Verify a JWT, sharing verified sessions across instances via Redis"""
+        key = "jwt:" + hashlib.sha1(token.encode()).hexdigest()
         
-        logger.info("Management server initialized successfully")
+        user_context = await self._get_cached_context(key)
+        if user_context is not None:
+            return user_context
+        
+        user_context = self.rbac.verify_jwt_token(token)
+        
+        # Never cache past the token's own expiry; the short TTL keeps
+        # revocation responsive
+        exp = jwt_hs256.decode_unverified(token).get('exp')
+        ttl = self.config['jwt_cache_ttl']
+        if exp is not None:
+            ttl = min(ttl, int(exp - time.time()))
+        await self._set_cached_context(key, user_context, ttl)
+        
+        return user_context
+    
+    async def wait_until_ready(self):
+        """Wait for deferred initialization, failing with 503 on timeout"""
+        if self.ready.is_set():
+            return
+        
+        try:
+            await asyncio.wait_for(self.ready.wait(), timeout=self.config['ready_timeout'])
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=503, detail="Service is starting up")
     
     async def shutdown(self):
         """Cleanup server components"""
+        if self._init_task and not self._init_task.done():
+            self._init_task.cancel()
+        
         # Stop MCP server if running
         await self.stop_mcp_server()
         
         if self.llm_manager:
             await self.llm_manager.close_all()
+        if self.redis:
+            await self.redis.aclose()
         logger.info("Management server shutdown complete")
     
     async def start_mcp_server(self):
@@ -127,9 +323,9 @@ class ManagementServer:
                 host=self.config['mcp_host'],
                 port=self.config['mcp_port']
             )
-            logger.info(f"MCP server started on ws://{self.config['mcp_host']}:{self.config['mcp_port']}")
+            logger.info("MCP server started", host=self.config['mcp_host'], port=self.config['mcp_port'])
         except Exception as e:
-            logger.error(f"Failed to start MCP server: {e}")
+            logger.error("Failed to start MCP server", error=str(e))
             raise
     
     async def stop_mcp_server(self):
@@ -141,51 +337,63 @@ class ManagementServer:
                 self.mcp_websocket_server = None
                 logger.info("MCP server stopped")
             except Exception as e:
-                logger.error(f"Failed to stop MCP server: {e}")
+                logger.error("Failed to stop MCP server", error=str(e))
     
     async def _ensure_admin_user(self):
         """Ensure admin user exists"""
         try:
             # Check if admin user exists
-            admin_user = self.db(self.db.users.username == self.config['admin_username']).select().first()
+            admin_user = await self.db_run(
+                lambda: self.db(self.db.users.username == self.config['admin_username']).select().first()
+            )
             
             if not admin_user:
-                # Create default organization
-                org = self.db.organizations.insert(
-                    name="Default Organization",
-                    description="Default organization for admin user",
-                    token_quota_daily=100000,
-                    token_quota_monthly=3000000,
-                    enabled=True
+                # Password hashing is deliberately slow; keep it off the event loop
+                password_hash = await self.rbac.run_kdf(
+                    self.rbac.hash_password, self.config['admin_password']
                 )
                 
-                # Create admin user
-                user_id = self.db.users.insert(
-                    username=self.config['admin_username'],
-                    email="admin@waddleai.com",
-                    password_hash=self.rbac.hash_password(self.config['admin_password']),
-                    role=Role.ADMIN,
-                    organization_id=org,
-                    enabled=True
-                )
+                def create_admin():
+                    # Create default organization
+                    org = self.db.organizations.insert(
+                        name="Default Organization",
+                        description="Default organization for admin user",
+                        token_quota_daily=100000,
+                        token_quota_monthly=3000000,
+                        enabled=True
+                    )
+                    
+                    # Create admin user
+                    user_id = self.db.users.insert(
+                        username=self.config['admin_username'],
+                        email="admin@waddleai.com",
+                        password_hash=password_hash,
+                        role=Role.ADMIN,
+                        organization_id=org,
+                        enabled=True
+                    )
+                    
+                    # Create admin API key (hashed here, on the worker thread)
+                    now = datetime.utcnow()
+                    api_key = f"wa-admin-{user_id}-{now:%Y%m%d}"
+                    self.db.api_keys.insert(
+                        key_hash=self.rbac.hash_password(api_key),
+                        name="Admin API Key",
+                        user_id=user_id,
+                        organization_id=org,
+                        permissions=["admin:*"],
+                        enabled=True,
+                        expires_at=now + timedelta(days=365)
+                    )
+                    return api_key
                 
-                # Create admin API key
-                api_key = f"wa-admin-{user_id}-{datetime.utcnow().strftime('%Y%m%d')}"
-                self.db.api_keys.insert(
-                    key_hash=self.rbac.hash_api_key(api_key),
-                    name="Admin API Key",
-                    user_id=user_id,
-                    organization_id=org,
-                    permissions=["admin:*"],
-                    enabled=True,
-                    expires_at=datetime.utcnow() + timedelta(days=365)
-                )
+                api_key = await self.db_run(create_admin)
                 
-                logger.info(f"Created admin user with API key: {api_key}")
+                logger.info("Created admin user", api_key=api_key)
                 print(f"🔑 Admin API Key: {api_key}")
                 
         except Exception as e:
-            logger.error(f"Failed to ensure admin user: {e}")
+            logger.error("Failed to ensure admin user", error=str(e))
 
 
 # Global server instance
@@ -205,65 +413,120 @@ app = FastAPI(
     title="WaddleAI Management Server",
     description="Web-based administration portal with RBAC configuration",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
-# CORS middleware
+# CORS middleware - explicit lists let Starlette answer preflights without
+# echoing back arbitrary request headers
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=[
+        origin.strip()
+        for origin in os.getenv('CORS_ORIGINS', 'http://localhost:8001').split(',')
+        if origin.strip()
+    ],
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+    allow_headers=["Authorization", "Content-Type"],
 )
 
+# Response compression - brotli for clients that accept it (falling back to
+# gzip for the rest), plain gzip when brotli-asgi isn't installed
+if HAS_BROTLI:
+    app.add_middleware(BrotliMiddleware, minimum_size=1024, gzip_fallback=True)
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 # Static files and templates
-templates = Jinja2Templates(directory="templates")
+# Templates don't change while the server runs, so skip the per-render mtime
+# check and keep compiled bytecode on disk across restarts
+os.makedirs(".jinja_cache", exist_ok=True)
+template_env = Environment(
+    loader=FileSystemLoader("templates"),
+    autoescape=True,
+    auto_reload=False,
+    bytecode_cache=FileSystemBytecodeCache(".jinja_cache")
+)
+templates = Jinja2Templates(env=template_env)
 
 
 # Authentication dependency
 async def get_current_user(request: FastAPIRequest):
     """Extract and validate user from request"""
-    # Check for Authorization header (API key or JWT)
+    # Already resolved earlier in this request
+    user_context = getattr(request.state, "user", None)
+    if user_context is not None:
+        return user_context
+    
+    user_context = await _authenticate_request(request)
+    request.state.user = user_context
+    return user_context
+
+
+async def _authenticate_request(request: FastAPIRequest):
+    """Resolve the user from a bearer token or session cookie"""
+    await mgmt_server.wait_until_ready()
+    
+    # A bearer token (API key or JWT) takes precedence over the session cookie
     auth_header = request.headers.get("Authorization")
     if auth_header and auth_header.startswith("Bearer "):
-        token = auth_header.split(" ")[1]
-        
-        try:
-            # Try JWT first
-            user_context = mgmt_server.rbac.verify_jwt_token(token)
-            if user_context:
-                return user_context
-        except:
-            pass
-        
-        try:
-            # Try API key
-            user_context = mgmt_server.rbac.verify_api_key(token)
-            if user_context:
-                return user_context
-        except:
-            pass
-    
-    # Check for session cookie
-    session_token = request.cookies.get("session")
-    if session_token:
-        try:
-            user_context = mgmt_server.rbac.verify_jwt_token(session_token)
-            if user_context:
-                return user_context
-        except:
-            pass
+        token = auth_header[7:]
+    else:
+        token = request.cookies.get("session")
+    
+    if not token:
+        raise HTTPException(status_code=401, detail="Authentication required")
+    
+    # The token's shape decides which verifier runs: API keys are "wa-"
+    # prefixed, anything else is treated as a JWT
+    try:
+        if token.startswith("wa-"):
+            user_context = await mgmt_server.verify_api_key(token)
+        else:
+            user_context = await mgmt_server.verify_jwt_token(token)
+    except AuthenticationError:
+        user_context = None
+    
+    if user_context is None:
+        raise HTTPException(status_code=401, detail="Authentication required")
     
-    raise HTTPException(status_code=401, detail="Authentication required")
+    return user_context
+
+
+def has_permission(user_context, permission: Permission) -> bool:
+    """Check a role permission with a single bitmask test"""
+    return user_context.has_permission(permission)
 
 
 # Health and metrics endpoints
+@app.get("/health/live")
+async def health_live():
+    """Liveness probe - the process is up and serving requests"""
+    return "alive"
+
+
+@app.get("/health/ready")
+async def health_ready():
+    """Readiness probe - initialized and dependencies are not unhealthy"""
+    if not mgmt_server.ready.is_set():
+        raise HTTPException(status_code=503, detail="Service is starting up")
+    
+    health_results = await mgmt_server.health_monitor.check_all_cached(
+        mgmt_server.config['health_cache_ttl']
+    )
+    if health_results['status'] == 'unhealthy':
+        raise HTTPException(status_code=503, detail="Service unhealthy")
+    return "ready"
+
+
 @app.get("/healthz")
 async def health_check():
     """Kubernetes-style health check"""
     try:
-        health_results = await mgmt_server.health_monitor.check_all()
+        health_results = await mgmt_server.health_monitor.check_all_cached(
+            mgmt_server.config['health_cache_ttl']
+        )
         if health_results['status'] == 'healthy':
             return "healthy"
         else:
@@ -272,17 +535,37 @@ async def health_check():
         raise HTTPException(status_code=503, detail=f"Health check failed: {str(e)}")
 
 
+def _etag(content: bytes) -> str:
+    """Strong ETag for a response body"""
+    return '"' + hashlib.sha1(content).hexdigest() + '"'
+
+
+def _etag_response(request: FastAPIRequest, content: bytes, media_type: str) -> Response:
+    """Build a response with an ETag, answering 304 when the client has it"""
+    etag = _etag(content)
+    if request.headers.get("If-None-Match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=content, media_type=media_type, headers={"ETag": etag})
+
+
 @app.get("/metrics")
-async def metrics():
+async def metrics(request: FastAPIRequest):
     """Prometheus metrics endpoint"""
     try:
-        metrics_data = mgmt_server.metrics.get_metrics()
-        return Response(
-            content=metrics_data,
-            media_type="text/plain; version=0.0.4; charset=utf-8"
+        # Scrapes within the cache window share one registry collection
+        metrics_data = mgmt_server.metrics.get_metrics_cached(
+            mgmt_server.config['metrics_cache_ttl']
+        )
+        etag = _etag(metrics_data)
+        if request.headers.get("If-None-Match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        return StreamingResponse(
+            mgmt_server.metrics.iter_metrics(metrics_data),
+            media_type=CONTENT_TYPE_LATEST,
+            headers={"ETag": etag}
         )
     except Exception as e:
-        logger.error(f"Metrics endpoint failed: {e}")
+        logger.error("Metrics endpoint failed", error=str(e))
         raise HTTPException(status_code=500, detail="Metrics unavailable")
 
 
@@ -298,8 +581,15 @@ async def login(request: FastAPIRequest):
         if not username or not password:
             raise HTTPException(status_code=400, detail="Username and password required")
         
+        await mgmt_server.wait_until_ready()
+        
         # Authenticate user
-        user_context = mgmt_server.rbac.authenticate_user(username, password)
+        try:
+            user_context = await mgmt_server.rbac.authenticate_user_async(
+                username, password, mgmt_server.db_run
+            )
+        except AuthenticationError:
+            user_context = None
         
         if not user_context:
             mgmt_server.metrics.record_auth_attempt("password", False)
@@ -310,7 +600,7 @@ async def login(request: FastAPIRequest):
         
         mgmt_server.metrics.record_auth_attempt("password", True)
         
-        response = JSONResponse(content={
+        response = ORJSONResponse(content={
             "access_token": token,
             "token_type": "bearer",
             "user": {
@@ -336,14 +626,14 @@ async def login(request: FastAPIRequest):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Login failed: {e}")
+        logger.error("Login failed", error=str(e))
         raise HTTPException(status_code=500, detail="Login failed")
 
 
 @app.post("/auth/logout")
 async def logout():
     """User logout endpoint"""
-    response = JSONResponse(content={"message": "Logged out successfully"})
+    response = ORJSONResponse(content={"message": "Logged out successfully"})
     response.delete_cookie("session")
     return response
 
@@ -381,15 +671,23 @@ async def _get_dashboard_data(user_context) -> Dict[str, Any]:
     
     # Admin dashboard
     if user_context.role == Role.ADMIN:
-        # System stats
-        total_users = mgmt_server.db(mgmt_server.db.users.id > 0).count()
-        total_orgs = mgmt_server.db(mgmt_server.db.organizations.id > 0).count()
-        total_api_keys = mgmt_server.db(mgmt_server.db.api_keys.enabled == True).count()
-        
-        # Recent usage
-        recent_usage = mgmt_server.db(
-            mgmt_server.db.token_usage.created_at > datetime.utcnow() - timedelta(days=7)
-        ).select(orderby=~mgmt_server.db.token_usage.created_at, limitby=(0, 10))
+        # System stats and recent usage are independent, so run them concurrently
+        total_users, total_orgs, total_api_keys, recent_usage = await asyncio.gather(
+            mgmt_server.db_run(
+                lambda: mgmt_server.db(mgmt_server.db.users).count()
+            ),
+            mgmt_server.db_run(
+                lambda: mgmt_server.db(mgmt_server.db.organizations).count()
+            ),
+            mgmt_server.db_run(
+                lambda: mgmt_server.db(mgmt_server.db.api_keys.enabled == True).count()
+            ),
+            mgmt_server.db_run(
+                lambda: mgmt_server.db(
+                    mgmt_server.db.token_usage.created_at > datetime.utcnow() - timedelta(days=7)
+                ).select(orderby=~mgmt_server.db.token_usage.created_at, limitby=(0, 10))
+            )
+        )
         
         data.update({
             "system_stats": {
@@ -397,19 +695,24 @@ async def _get_dashboard_data(user_context) -> Dict[str, Any]:
                 "total_organizations": total_orgs,
                 "active_api_keys": total_api_keys
             },
-            "recent_usage": [dict(usage) for usage in recent_usage]
+            "recent_usage": recent_usage.as_list()
         })
     
     # Organization manager dashboard
     elif user_context.role == Role.RESOURCE_MANAGER:
-        org_users = mgmt_server.db(
-            mgmt_server.db.users.organization_id == user_context.organization_id
-        ).count()
-        
-        org_usage = mgmt_server.db(
-            (mgmt_server.db.token_usage.organization_id == user_context.organization_id) &
-            (mgmt_server.db.token_usage.created_at > datetime.utcnow() - timedelta(days=30))
-        ).select()
+        org_users, org_usage = await asyncio.gather(
+            mgmt_server.db_run(
+                lambda: mgmt_server.db(
+                    mgmt_server.db.users.organization_id == user_context.organization_id
+                ).count()
+            ),
+            mgmt_server.db_run(
+                lambda: mgmt_server.db(
+                    (mgmt_server.db.token_usage.organization_id == user_context.organization_id) &
+                    (mgmt_server.db.token_usage.created_at > datetime.utcnow() - timedelta(days=30))
+                ).select()
+            )
+        )
         
         total_tokens = sum(usage.waddleai_tokens for usage in org_usage)
         
@@ -418,48 +721,97 @@ async def _get_dashboard_data(user_context) -> Dict[str, Any]:
                 "total_users": org_users,
                 "monthly_token_usage": total_tokens
             },
-            "organization_usage": [dict(usage) for usage in org_usage[-20:]]
+            "organization_usage": org_usage[-20:].as_list()
         })
     
     # Reporter dashboard
     elif user_context.role == Role.REPORTER:
-        org_usage = mgmt_server.db(
-            (mgmt_server.db.token_usage.organization_id == user_context.organization_id) &
-            (mgmt_server.db.token_usage.created_at > datetime.utcnow() - timedelta(days=30))
-        ).select()
+        org_usage = await mgmt_server.db_run(
+            lambda: mgmt_server.db(
+                (mgmt_server.db.token_usage.organization_id == user_context.organization_id) &
+                (mgmt_server.db.token_usage.created_at > datetime.utcnow() - timedelta(days=30))
+            ).select()
+        )
         
         data.update({
-            "usage_analytics": [dict(usage) for usage in org_usage]
+            "usage_analytics": org_usage.as_list()
         })
     
     # User dashboard
     else:
-        user_usage = mgmt_server.db(
-            (mgmt_server.db.token_usage.user_id == user_context.user_id) &
-            (mgmt_server.db.token_usage.created_at > datetime.utcnow() - timedelta(days=30))
-        ).select()
-        
-        user_api_keys = mgmt_server.db(
-            mgmt_server.db.api_keys.user_id == user_context.user_id
-        ).select()
+        user_usage, user_api_keys = await asyncio.gather(
+            mgmt_server.db_run(
+                lambda: mgmt_server.db(
+                    (mgmt_server.db.token_usage.user_id == user_context.user_id) &
+                    (mgmt_server.db.token_usage.created_at > datetime.utcnow() - timedelta(days=30))
+                ).select()
+            ),
+            mgmt_server.db_run(
+                lambda: mgmt_server.db(
+                    mgmt_server.db.api_keys.user_id == user_context.user_id
+                ).select(*_api_key_fields())
+            )
+        )
         
         data.update({
-            "personal_usage": [dict(usage) for usage in user_usage],
-            "api_keys": [dict(key) for key in user_api_keys]
+            "personal_usage": user_usage.as_list(),
+            "api_keys": user_api_keys.as_list()
         })
     
     return data
 
 
+MAX_PAGE_SIZE = 500
+
+
+async def _select_page(
+    table, query, page: int, size: int, total: bool, fields: Optional[List] = None
+) -> Dict[str, Any]:
+    """Select one page of rows ordered by id, with the total count on request"""
+    db = mgmt_server.db
+    size = max(1, min(size, MAX_PAGE_SIZE))
+    offset = (max(page, 1) - 1) * size
+    
+    def fetch():
+        # An unfiltered listing selects without any WHERE clause
+        rows_set = db(query) if query is not None else db()
+        rows = rows_set.select(
+            *(fields or [table.ALL]), orderby=table.id, limitby=(offset, offset + size)
+        )
+        count = db(query if query is not None else table).count() if total else None
+        return rows, count
+    
+    rows, count = await mgmt_server.db_run(fetch)
+    result = {"rows": rows, "page": max(page, 1), "size": size}
+    if total:
+        result["total"] = count
+    return result
+
+
+def _api_key_fields() -> List:
+    """api_keys columns safe to return to clients (everything but key_hash)"""
+    return [field for field in mgmt_server.db.api_keys if field.name != 'key_hash']
+
+
+def _page_meta(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Pagination fields to include in a list response"""
+    return {key: value for key, value in result.items() if key != "rows"}
+
+
 # API endpoints for management
 @app.get("/api/organizations")
-async def list_organizations(user_context = Depends(get_current_user)):
+async def list_organizations(
+    user_context = Depends(get_current_user),
+    page: int = 1,
+    size: int = 100,
+    total: bool = False
+):
     """List organizations (Admin only)"""
-    if not mgmt_server.rbac.check_permission(user_context, Permission.ADMIN_MANAGE):
+    if not has_permission(user_context, Permission.SYSTEM_CONFIG):
         raise HTTPException(status_code=403, detail="Admin permission required")
     
-    orgs = mgmt_server.db(mgmt_server.db.organizations.id > 0).select()
-    return {"organizations": [dict(org) for org in orgs]}
+    result = await _select_page(mgmt_server.db.organizations, None, page, size, total)
+    return {"organizations": result["rows"].as_list(), **_page_meta(result)}
 
 
 @app.post("/api/organizations")
@@ -468,13 +820,14 @@ async def create_organization(
     user_context = Depends(get_current_user)
 ):
     """Create organization (Admin only)"""
-    if not mgmt_server.rbac.check_permission(user_context, Permission.ADMIN_MANAGE):
+    if not has_permission(user_context, Permission.SYSTEM_CONFIG):
         raise HTTPException(status_code=403, detail="Admin permission required")
     
     try:
         body = await request.json()
         
-        org_id = mgmt_server.db.organizations.insert(
+        org_id = await mgmt_server.db_run(
+            mgmt_server.db.organizations.insert,
             name=body.get("name"),
             description=body.get("description", ""),
             token_quota_daily=body.get("token_quota_daily", 10000),
@@ -485,22 +838,27 @@ async def create_organization(
         return {"id": org_id, "status": "created"}
         
     except Exception as e:
-        logger.error(f"Failed to create organization: {e}")
+        logger.error("Failed to create organization", error=str(e))
         raise HTTPException(status_code=500, detail="Failed to create organization")
 
 
 @app.get("/api/users")
-async def list_users(user_context = Depends(get_current_user)):
+async def list_users(
+    user_context = Depends(get_current_user),
+    page: int = 1,
+    size: int = 100,
+    total: bool = False
+):
     """List users"""
     # Admin sees all users, others see organization users only
-    if mgmt_server.rbac.check_permission(user_context, Permission.ADMIN_MANAGE):
-        users = mgmt_server.db(mgmt_server.db.users.id > 0).select()
+    if has_permission(user_context, Permission.SYSTEM_CONFIG):
+        query = None
     else:
-        users = mgmt_server.db(
-            mgmt_server.db.users.organization_id == user_context.organization_id
-        ).select()
+        query = mgmt_server.db.users.organization_id == user_context.organization_id
+    
+    result = await _select_page(mgmt_server.db.users, query, page, size, total)
     
-    return {"users": [dict(user) for user in users]}
+    return {"users": result["rows"].as_list(), **_page_meta(result)}
 
 
 @app.post("/api/users")
@@ -510,8 +868,8 @@ async def create_user(
 ):
     """Create user"""
     # Check permissions
-    if not (mgmt_server.rbac.check_permission(user_context, Permission.ADMIN_MANAGE) or
-            mgmt_server.rbac.check_permission(user_context, Permission.RESOURCE_MANAGE)):
+    if not (has_permission(user_context, Permission.SYSTEM_CONFIG) or
+            has_permission(user_context, Permission.ORG_UPDATE)):
         raise HTTPException(status_code=403, detail="Insufficient permissions")
     
     try:
@@ -522,10 +880,15 @@ async def create_user(
         if user_context.role == Role.RESOURCE_MANAGER:
             org_id = user_context.organization_id
         
-        user_id = mgmt_server.db.users.insert(
+        password_hash = await mgmt_server.rbac.run_kdf(
+            mgmt_server.rbac.hash_password, body.get("password")
+        )
+        
+        user_id = await mgmt_server.db_run(
+            mgmt_server.db.users.insert,
             username=body.get("username"),
             email=body.get("email"),
-            password_hash=mgmt_server.rbac.hash_password(body.get("password")),
+            password_hash=password_hash,
             role=Role(body.get("role", "user")),
             organization_id=org_id,
             enabled=True
@@ -534,18 +897,23 @@ async def create_user(
         return {"id": user_id, "status": "created"}
         
     except Exception as e:
-        logger.error(f"Failed to create user: {e}")
+        logger.error("Failed to create user", error=str(e))
         raise HTTPException(status_code=500, detail="Failed to create user")
 
 
 @app.get("/api/connection_links")
-async def list_connection_links(user_context = Depends(get_current_user)):
+async def list_connection_links(
+    user_context = Depends(get_current_user),
+    page: int = 1,
+    size: int = 100,
+    total: bool = False
+):
     """List LLM connection links (Admin only)"""
-    if not mgmt_server.rbac.check_permission(user_context, Permission.ADMIN_MANAGE):
+    if not has_permission(user_context, Permission.SYSTEM_CONFIG):
         raise HTTPException(status_code=403, detail="Admin permission required")
     
-    links = mgmt_server.db(mgmt_server.db.connection_links.id > 0).select()
-    return {"connection_links": [dict(link) for link in links]}
+    result = await _select_page(mgmt_server.db.connection_links, None, page, size, total)
+    return {"connection_links": result["rows"].as_list(), **_page_meta(result)}
 
 
 @app.post("/api/connection_links")
@@ -554,13 +922,14 @@ async def create_connection_link(
     user_context = Depends(get_current_user)
 ):
     """Create LLM connection link (Admin only)"""
-    if not mgmt_server.rbac.check_permission(user_context, Permission.ADMIN_MANAGE):
+    if not has_permission(user_context, Permission.SYSTEM_CONFIG):
         raise HTTPException(status_code=403, detail="Admin permission required")
     
     try:
         body = await request.json()
         
-        link_id = mgmt_server.db.connection_links.insert(
+        link_id = await mgmt_server.db_run(
+            mgmt_server.db.connection_links.insert,
             name=body.get("name"),
             provider=body.get("provider"),
             endpoint_url=body.get("endpoint_url"),
@@ -572,38 +941,37 @@ async def create_connection_link(
         )
         
         # Reload connectors to pick up new link
-        mgmt_server.llm_manager.reload_connectors()
+        await mgmt_server.db_run(mgmt_server.llm_manager.reload_connectors)
         
         return {"id": link_id, "status": "created"}
         
     except Exception as e:
-        logger.error(f"Failed to create connection link: {e}")
+        logger.error("Failed to create connection link", error=str(e))
         raise HTTPException(status_code=500, detail="Failed to create connection link")
 
 
 @app.get("/api/api_keys")
-async def list_api_keys(user_context = Depends(get_current_user)):
+async def list_api_keys(
+    user_context = Depends(get_current_user),
+    page: int = 1,
+    size: int = 100,
+    total: bool = False
+):
     """List API keys based on user role"""
     # Admin sees all, Resource Manager sees org keys, Users see their own
-    if mgmt_server.rbac.check_permission(user_context, Permission.ADMIN_MANAGE):
-        keys = mgmt_server.db(mgmt_server.db.api_keys.id > 0).select()
-    elif mgmt_server.rbac.check_permission(user_context, Permission.RESOURCE_MANAGE):
-        keys = mgmt_server.db(
-            mgmt_server.db.api_keys.organization_id == user_context.organization_id
-        ).select()
+    if has_permission(user_context, Permission.SYSTEM_CONFIG):
+        query = None
+    elif has_permission(user_context, Permission.ORG_UPDATE):
+        query = mgmt_server.db.api_keys.organization_id == user_context.organization_id
     else:
-        keys = mgmt_server.db(
-            mgmt_server.db.api_keys.user_id == user_context.user_id
-        ).select()
+        query = mgmt_server.db.api_keys.user_id == user_context.user_id
     
-    # Don't return actual key hashes
-    api_keys = []
-    for key in keys:
-        key_dict = dict(key)
-        key_dict['key_hash'] = '***REDACTED***'
-        api_keys.append(key_dict)
+    # Key hashes are never selected, let alone returned
+    result = await _select_page(
+        mgmt_server.db.api_keys, query, page, size, total, fields=_api_key_fields()
+    )
     
-    return {"api_keys": api_keys}
+    return {"api_keys": result["rows"].as_list(), **_page_meta(result)}
 
 
 @app.post("/api/api_keys")
@@ -621,26 +989,30 @@ async def create_api_key(
         
         # Permission checks
         if target_user_id != user_context.user_id:
-            if not (mgmt_server.rbac.check_permission(user_context, Permission.ADMIN_MANAGE) or
-                    (mgmt_server.rbac.check_permission(user_context, Permission.RESOURCE_MANAGE) and
+            if not (has_permission(user_context, Permission.SYSTEM_CONFIG) or
+                    (has_permission(user_context, Permission.ORG_UPDATE) and
                      target_org_id == user_context.organization_id)):
                 raise HTTPException(status_code=403, detail="Insufficient permissions")
         
-        # Generate API key
-        import secrets
-        key_suffix = secrets.token_hex(8)
-        api_key = f"wa-{target_user_id}-{key_suffix}"
+        # Generate API key (format: wa-{key_id}-{secret}, looked up by key_id)
+        public_id = secrets.token_hex(8)
+        api_key = f"wa-{public_id}-{secrets.token_urlsafe(12)}"
+        expires_at = datetime.utcnow() + timedelta(days=body.get("expires_days", 365))
+        
+        key_hash = await mgmt_server.rbac.run_kdf(mgmt_server.rbac.hash_password, api_key)
         
         # Insert into database
-        key_id = mgmt_server.db.api_keys.insert(
-            key_hash=mgmt_server.rbac.hash_api_key(api_key),
+        key_id = await mgmt_server.db_run(
+            mgmt_server.db.api_keys.insert,
+            key_id=public_id,
+            key_hash=key_hash,
             name=body.get("name", "Unnamed API Key"),
             user_id=target_user_id,
             organization_id=target_org_id,
             permissions=body.get("permissions", []),
             enabled=True,
             rate_limit=body.get("rate_limit", 1000),
-            expires_at=datetime.utcnow() + timedelta(days=body.get("expires_days", 365))
+            expires_at=expires_at
         )
         
         return {
@@ -653,7 +1025,7 @@ async def create_api_key(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Failed to create API key: {e}")
+        logger.error("Failed to create API key", error=str(e))
         raise HTTPException(status_code=500, detail="Failed to create API key")
 
 
@@ -662,26 +1034,33 @@ async def delete_api_key(key_id: int, user_context = Depends(get_current_user)):
     """Delete API key"""
     try:
         # Get the key to check permissions
-        key = mgmt_server.db(mgmt_server.db.api_keys.id == key_id).select().first()
+        key = await mgmt_server.db_run(
+            lambda: mgmt_server.db(mgmt_server.db.api_keys.id == key_id).select().first()
+        )
         if not key:
             raise HTTPException(status_code=404, detail="API key not found")
         
         # Permission checks
         if key.user_id != user_context.user_id:
-            if not (mgmt_server.rbac.check_permission(user_context, Permission.ADMIN_MANAGE) or
-                    (mgmt_server.rbac.check_permission(user_context, Permission.RESOURCE_MANAGE) and
+            if not (has_permission(user_context, Permission.SYSTEM_CONFIG) or
+                    (has_permission(user_context, Permission.ORG_UPDATE) and
                      key.organization_id == user_context.organization_id)):
                 raise HTTPException(status_code=403, detail="Insufficient permissions")
         
         # Disable instead of delete to preserve audit trail
-        mgmt_server.db(mgmt_server.db.api_keys.id == key_id).update(enabled=False)
+        await mgmt_server.db_run(
+            lambda: mgmt_server.db(mgmt_server.db.api_keys.id == key_id).update(enabled=False)
+        )
+        # A revoked key must not keep authenticating from the shared cache
+        await mgmt_server.revoke_api_key(key_id)
+        mgmt_server.rbac.invalidate_auth_cache()
         
         return {"status": "deleted"}
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Failed to delete API key: {e}")
+        logger.error("Failed to delete API key", error=str(e))
         raise HTTPException(status_code=500, detail="Failed to delete API key")
 
 
@@ -692,70 +1071,45 @@ async def get_usage_stats(
 ):
     """Get usage statistics"""
     try:
+        usage = mgmt_server.db.token_usage
+        
         # Build query based on user role
-        query = mgmt_server.db.token_usage.created_at > datetime.utcnow() - timedelta(days=days)
+        query = usage.date > date.today() - timedelta(days=days)
         
-        if user_context.role == Role.ADMIN:
-            # Admin sees all usage
-            usage_records = mgmt_server.db(query).select()
-        elif user_context.role in [Role.RESOURCE_MANAGER, Role.REPORTER]:
+        # Admin sees all usage
+        if user_context.role in [Role.RESOURCE_MANAGER, Role.REPORTER]:
             # Org-level users see organization usage
-            usage_records = mgmt_server.db(
-                query & (mgmt_server.db.token_usage.organization_id == user_context.organization_id)
-            ).select()
-        else:
+            query &= (usage.organization_id == user_context.organization_id)
+        elif user_context.role != Role.ADMIN:
             # Regular users see their own usage
-            usage_records = mgmt_server.db(
-                query & (mgmt_server.db.token_usage.user_id == user_context.user_id)
-            ).select()
+            query &= (usage.user_id == user_context.user_id)
         
-        # Aggregate statistics
-        total_tokens = sum(record.waddleai_tokens for record in usage_records)
-        total_requests = len(usage_records)
-        
-        # Group by day
-        daily_usage = {}
-        for record in usage_records:
-            day = record.created_at.date().isoformat()
-            if day not in daily_usage:
-                daily_usage[day] = {'tokens': 0, 'requests': 0}
-            daily_usage[day]['tokens'] += record.waddleai_tokens
-            daily_usage[day]['requests'] += 1
-        
-        # Group by provider
-        provider_usage = {}
-        for record in usage_records:
-            provider = record.provider
-            if provider not in provider_usage:
-                provider_usage[provider] = {'tokens': 0, 'requests': 0}
-            provider_usage[provider]['tokens'] += record.waddleai_tokens
-            provider_usage[provider]['requests'] += 1
+        # Aggregate in the database rather than loading every record
+        stats = await mgmt_server.db_run(summarize_usage, mgmt_server.db, query)
         
-        return {
-            "period_days": days,
-            "total_tokens": total_tokens,
-            "total_requests": total_requests,
-            "daily_usage": daily_usage,
-            "provider_usage": provider_usage,
-            "recent_usage": [dict(record) for record in usage_records[-50:]]
-        }
+        return {"period_days": days, **stats}
         
     except Exception as e:
-        logger.error(f"Failed to get usage stats: {e}")
+        logger.error("Failed to get usage stats", error=str(e))
         raise HTTPException(status_code=500, detail="Failed to get usage stats")
 
 
 @app.get("/api/system/health")
-async def system_health(user_context = Depends(get_current_user)):
+async def system_health(
+    request: FastAPIRequest,
+    user_context = Depends(get_current_user)
+):
     """Get system health status (Admin only)"""
-    if not mgmt_server.rbac.check_permission(user_context, Permission.ADMIN_MANAGE):
+    if not has_permission(user_context, Permission.SYSTEM_CONFIG):
         raise HTTPException(status_code=403, detail="Admin permission required")
     
     try:
-        health_results = await mgmt_server.health_monitor.check_all()
-        return health_results
+        health_results = await mgmt_server.health_monitor.check_all_cached(
+            mgmt_server.config['health_cache_ttl']
+        )
+        return _etag_response(request, orjson.dumps(health_results), "application/json")
     except Exception as e:
-        logger.error(f"Health check failed: {e}")
+        logger.error("Health check failed", error=str(e))
         raise HTTPException(status_code=500, detail="Health check failed")
 
 
@@ -766,7 +1120,7 @@ async def ollama_pull_model(
     user_context = Depends(get_current_user)
 ):
     """Pull model in Ollama (Admin only)"""
-    if not mgmt_server.rbac.check_permission(user_context, Permission.ADMIN_MANAGE):
+    if not has_permission(user_context, Permission.SYSTEM_CONFIG):
         raise HTTPException(status_code=403, detail="Admin permission required")
     
     try:
@@ -777,13 +1131,8 @@ async def ollama_pull_model(
             raise HTTPException(status_code=400, detail="Model name required")
         
         # Find Ollama connector
-        ollama_connector = None
-        for connector in mgmt_server.llm_manager.connectors.values():
-            if hasattr(connector, 'pull_model'):
-                ollama_connector = connector
-                break
-        
-        if not ollama_connector:
+        ollama_connector = mgmt_server.llm_manager.get_ollama()
+        if ollama_connector is None:
             raise HTTPException(status_code=404, detail="No Ollama connector found")
         
         result = await ollama_connector.pull_model(model_name)
@@ -792,7 +1141,7 @@ async def ollama_pull_model(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Failed to pull Ollama model: {e}")
+        logger.error("Failed to pull Ollama model", error=str(e))
         raise HTTPException(status_code=500, detail="Failed to pull model")
 
 
@@ -802,18 +1151,13 @@ async def ollama_remove_model(
     user_context = Depends(get_current_user)
 ):
     """Remove model from Ollama (Admin only)"""
-    if not mgmt_server.rbac.check_permission(user_context, Permission.ADMIN_MANAGE):
+    if not has_permission(user_context, Permission.SYSTEM_CONFIG):
         raise HTTPException(status_code=403, detail="Admin permission required")
     
     try:
         # Find Ollama connector
-        ollama_connector = None
-        for connector in mgmt_server.llm_manager.connectors.values():
-            if hasattr(connector, 'remove_model'):
-                ollama_connector = connector
-                break
-        
-        if not ollama_connector:
+        ollama_connector = mgmt_server.llm_manager.get_ollama()
+        if ollama_connector is None:
             raise HTTPException(status_code=404, detail="No Ollama connector found")
         
         result = await ollama_connector.remove_model(model_name)
@@ -822,7 +1166,7 @@ async def ollama_remove_model(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Failed to remove Ollama model: {e}")
+        logger.error("Failed to remove Ollama model", error=str(e))
         raise HTTPException(status_code=500, detail="Failed to remove model")
 
 
@@ -830,7 +1174,7 @@ async def ollama_remove_model(
 @app.get("/api/mcp/status")
 async def mcp_status(user_context = Depends(get_current_user)):
     """Get MCP server status (Admin only)"""
-    if not mgmt_server.rbac.check_permission(user_context, Permission.ADMIN_MANAGE):
+    if not has_permission(user_context, Permission.SYSTEM_CONFIG):
         raise HTTPException(status_code=403, detail="Admin permission required")
     
     return {
@@ -845,7 +1189,7 @@ async def mcp_status(user_context = Depends(get_current_user)):
 @app.post("/api/mcp/start")
 async def start_mcp_server(user_context = Depends(get_current_user)):
     """Start MCP server (Admin only)"""
-    if not mgmt_server.rbac.check_permission(user_context, Permission.ADMIN_MANAGE):
+    if not has_permission(user_context, Permission.SYSTEM_CONFIG):
         raise HTTPException(status_code=403, detail="Admin permission required")
     
     try:
@@ -859,14 +1203,14 @@ async def start_mcp_server(user_context = Depends(get_current_user)):
         }
         
     except Exception as e:
-        logger.error(f"Failed to start MCP server: {e}")
+        logger.error("Failed to start MCP server", error=str(e))
         raise HTTPException(status_code=500, detail=f"Failed to start MCP server: {str(e)}")
 
 
 @app.post("/api/mcp/stop")
 async def stop_mcp_server(user_context = Depends(get_current_user)):
     """Stop MCP server (Admin only)"""
-    if not mgmt_server.rbac.check_permission(user_context, Permission.ADMIN_MANAGE):
+    if not has_permission(user_context, Permission.SYSTEM_CONFIG):
         raise HTTPException(status_code=403, detail="Admin permission required")
     
     try:
@@ -877,14 +1221,14 @@ async def stop_mcp_server(user_context = Depends(get_current_user)):
         return {"status": "stopped", "message": "MCP server stopped"}
         
     except Exception as e:
-        logger.error(f"Failed to stop MCP server: {e}")
+        logger.error("Failed to stop MCP server", error=str(e))
         raise HTTPException(status_code=500, detail=f"Failed to stop MCP server: {str(e)}")
 
 
 @app.get("/api/mcp/clients")
 async def list_mcp_clients(user_context = Depends(get_current_user)):
     """List active MCP clients (Admin only)"""
-    if not mgmt_server.rbac.check_permission(user_context, Permission.ADMIN_MANAGE):
+    if not has_permission(user_context, Permission.SYSTEM_CONFIG):
         raise HTTPException(status_code=403, detail="Admin permission required")
     
     if not mgmt_server.mcp_server:
@@ -904,11 +1248,24 @@ async def list_mcp_clients(user_context = Depends(get_current_user)):
 
 
 if __name__ == "__main__":
+    # Each of the WEB_CONCURRENCY workers is a separate process with its own
+    # in-memory state: the health and metrics caches, the RBAC manager's JWT
+    # cache and the compiled templates. Verified API keys and sessions, and
+    # their revocation, go through Redis and are shared. The local caches
+    # only keep results for a few seconds, but /metrics reports the counters
+    # of whichever worker answers the scrape.
+    dev = os.getenv("DEV") == "1"
+    
     # Run with uvicorn
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=8001,
-        reload=True,
+        # Auto-reload is for development only (DEV=1); uvicorn ignores
+        # workers when reloading, so development runs a single process
+        reload=dev,
+        loop="uvloop",
+        http="httptools",
+        workers=1 if dev else mgmt_server.config['web_concurrency'],
         log_level="info"
     )
\ No newline at end of file
@@ -7,16 +7,17 @@ import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
 
-from fastapi import FastAPI, HTTPException, Request, Depends, Header
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse, Response
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse, StreamingResponse, Response
 import uvicorn
 import asyncio
 import aiohttp
 from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Dict, Any, List
-import json
+import orjson
 import time
+import hashlib
 from datetime import datetime
 import logging
 import structlog
@@ -28,13 +29,16 @@ from shared.utils.token_manager import create_token_manager
 from shared.utils.llm_connectors import create_llm_connection_manager
 from shared.utils.request_router import create_request_router, RoutingStrategy
 from shared.utils.memory_integration import create_memory_manager
-from shared.utils.metrics import get_proxy_metrics, MetricsMiddleware
+from shared.utils.metrics import get_proxy_metrics
 from shared.utils.health_checks import WaddleAIHealthMonitor
+from shared.utils.singleflight import SingleFlight
 from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 
 # Configure structured logging
 structlog.configure(
     processors=[
+        # Drop events below the configured level before any formatting work
+        structlog.stdlib.filter_by_level,
         structlog.processors.TimeStamper(fmt="ISO"),
         structlog.processors.JSONRenderer()
     ],
@@ -64,36 +68,92 @@ class ProxyServer:
         self.http_session = None
         self.metrics = proxy_metrics
         
+        # Collapses identical concurrent auth and quota lookups
+        self.singleflight = SingleFlight(on_coalesced=self.metrics.record_singleflight_coalesced)
+        
         # Configuration
         self.config = {
             'jwt_secret': os.getenv('JWT_SECRET', 'your-secret-key-change-in-production'),
             'management_server_url': os.getenv('MANAGEMENT_SERVER_URL', 'http://localhost:8001'),
             'security_policy': os.getenv('SECURITY_POLICY', 'balanced'),
             'max_concurrent_requests': int(os.getenv('MAX_CONCURRENT_REQUESTS', '100')),
+            'auth_cache_ttl': float(os.getenv('AUTH_CACHE_TTL', '30')),
+            'db_pool_size': int(os.getenv('DB_POOL_SIZE', '10')),
+            'max_background_tasks': int(os.getenv('MAX_BACKGROUND_TASKS', '256')),
+            'models_cache_ttl': float(os.getenv('MODELS_CACHE_TTL', '30')),
+            'routing_stats_cache_ttl': float(os.getenv('ROUTING_STATS_CACHE_TTL', '5')),
+            'max_request_bytes': int(os.getenv('MAX_REQUEST_BYTES', str(1 << 20))),
+            'usage_batch_size': int(os.getenv('USAGE_BATCH_SIZE', '500')),
+            'usage_batch_delay': float(os.getenv('USAGE_BATCH_DELAY', '0.05')),
+            'security_log_queue_size': int(os.getenv('SECURITY_LOG_QUEUE_SIZE', '10000')),
+            'security_log_batch_size': int(os.getenv('SECURITY_LOG_BATCH_SIZE', '500')),
+            'security_log_batch_delay': float(os.getenv('SECURITY_LOG_BATCH_DELAY', '0.1')),
         }
+        
+        # Short-lived copies of /v1/models and /api/routing/stats as (at, value)
+        self._models_cache = None
+        self._routing_stats_cache = None
+        
+        # Fire-and-forget work (memory writes) kept referenced and bounded
+        self._bg_tasks = set()
+        self._bg_sem = asyncio.Semaphore(self.config['max_background_tasks'])
     
     async def startup(self):
         """Initialize server components"""
         logger.info("Starting WaddleAI Proxy Server")
         
+        # Blocking DAL calls run on the default executor, sized to the DB pool
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=self.config['db_pool_size'], thread_name_prefix='db')
+        )
+        
         # Initialize database
-        self.db = get_db()
-        init_default_data(self.db)
+        self.db = get_db(pool_size=self.config['db_pool_size'])
+        await self.db_run(init_default_data, self.db)
+        
+        # Open the pool's connections now rather than on the first requests
+        await asyncio.gather(*(
+            self.db_run(self.db.executesql, 'SELECT 1')
+            for _ in range(self.config['db_pool_size'])
+        ))
         
         # Initialize components
-        self.rbac = RBACManager(self.db, self.config['jwt_secret'])
+        self.rbac = RBACManager(
+            self.db, self.config['jwt_secret'], auth_cache_ttl=self.config['auth_cache_ttl']
+        )
         self.security_scanner = create_security_scanner(self.db, self.config['security_policy'])
+        self.security_scanner.start_log_writer(
+            max_queue=self.config['security_log_queue_size'],
+            max_batch=self.config['security_log_batch_size'],
+            max_delay=self.config['security_log_batch_delay']
+        )
         self.token_manager = create_token_manager(self.db)
-        self.llm_manager = create_llm_connection_manager(self.db)
-        self.request_router = create_request_router(self.llm_manager, self.db)
-        self.memory_manager = create_memory_manager(self.db, persist_directory="./proxy_memory")
+        self.token_manager.start_writer(
+            max_batch=self.config['usage_batch_size'],
+            max_delay=self.config['usage_batch_delay']
+        )
         
-        # Initialize HTTP session for external requests
+        # Initialize HTTP session for external requests, pooled per host and
+        # shared with the LLM connectors. Only connect and per-read waits are
+        # bounded, so long generations don't hold a slot for a fixed total
         self.http_session = aiohttp.ClientSession(
-            timeout=aiohttp.ClientTimeout(total=300),
-            connector=aiohttp.TCPConnector(limit=100)
+            timeout=aiohttp.ClientTimeout(total=None, connect=5, sock_connect=5, sock_read=120),
+            connector=aiohttp.TCPConnector(
+                limit=512,
+                limit_per_host=64,
+                use_dns_cache=True,
+                ttl_dns_cache=300,
+                keepalive_timeout=75,
+                enable_cleanup_closed=True,
+                force_close=False
+            )
         )
         
+        self.llm_manager = create_llm_connection_manager(self.db, http_session=self.http_session)
+        self.request_router = create_request_router(self.llm_manager, self.db)
+        self.memory_manager = create_memory_manager(self.db, persist_directory="./proxy_memory")
+        await self._warm_provider_connections()
+        
         # Initialize health monitoring
         self.health_monitor = WaddleAIHealthMonitor('proxy')
         self.health_monitor.add_database_check('database', self.db)
@@ -113,14 +173,104 @@ class ProxyServer:
         
         logger.info("Proxy server initialized successfully")
     
+    async def _warm_provider_connections(self):
+        """Open a pooled connection to each configured LLM endpoint"""
+        endpoints = {
+            connector.endpoint_url
+            for connector in self.llm_manager.connectors.values()
+            if connector.endpoint_url
+        }
+        
+        async def warm(url):
+            try:
+                async with self.http_session.head(url, timeout=aiohttp.ClientTimeout(total=5)):
+                    pass
+            except Exception as e:
+                logger.warning("Connection warmup failed", endpoint=url, error=str(e))
+        
+        await asyncio.gather(*(warm(url) for url in endpoints))
+    
+    async def db_run(self, fn, *args, **kwargs):
+        """Run blocking DAL work in a worker thread and commit it there"""
+        return await asyncio.to_thread(self._run_in_transaction, fn, args, kwargs)
+    
+    def _run_in_transaction(self, fn, args, kwargs):
+        """Run fn on the calling thread's connection as one transaction"""
+        try:
+            result = fn(*args, **kwargs)
+            self.db.commit()
+            return result
+        except Exception:
+            self.db.rollback()
+            raise
+    
+    async def list_models_cached(self):
+        """Provider model list, refreshed at most every models_cache_ttl"""
+        cached = self._models_cache
+        if cached and time.monotonic() - cached[0] < self.config['models_cache_ttl']:
+            return cached[1]
+        
+        async def refresh():
+            models = await self.llm_manager.list_all_models() or []
+            self._models_cache = (time.monotonic(), models)
+            return models
+        
+        # Concurrent misses share one round of provider calls
+        return await self.singleflight.do(("models",), refresh)
+    
+    def routing_stats_cached(self):
+        """Routing statistics, rebuilt at most every routing_stats_cache_ttl"""
+        cached = self._routing_stats_cache
+        if cached and time.monotonic() - cached[0] < self.config['routing_stats_cache_ttl']:
+            return cached[1]
+        
+        stats = {
+            "routing_strategy": self.request_router.default_strategy.value,
+            "provider_stats": self.request_router.get_provider_stats()
+        }
+        self._routing_stats_cache = (time.monotonic(), stats)
+        return stats
+    
+    def invalidate_routing_stats(self):
+        """Drop cached routing statistics after a routing change"""
+        self._routing_stats_cache = None
+    
+    def spawn(self, coro):
+        """Run coro in the background, holding a reference until it finishes"""
+        task = asyncio.create_task(self._bounded(coro))
+        self._bg_tasks.add(task)
+        task.add_done_callback(self._bg_task_done)
+        return task
+    
+    async def _bounded(self, coro):
+        async with self._bg_sem:
+            return await coro
+    
+    def _bg_task_done(self, task):
+        self._bg_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Background task failed", error=str(task.exception()))
+    
     async def shutdown(self):
         """Cleanup server components"""
-        if self.http_session:
-            await self.http_session.close()
+        if self._bg_tasks:
+            await asyncio.gather(*self._bg_tasks, return_exceptions=True)
+        
+        if self.token_manager:
+            await asyncio.to_thread(self.token_manager.stop_writer)
+        
+        if self.security_scanner:
+            await asyncio.to_thread(self.security_scanner.stop_log_writer)
+        
+        if self.rbac:
+            await self.db_run(self.rbac.flush_last_used)
         
         if self.llm_manager:
             await self.llm_manager.close_all()
         
+        if self.http_session:
+            await self.http_session.close()
+        
         logger.info("Proxy server shutdown complete")
 
 
@@ -141,42 +291,13 @@ app = FastAPI(
     title="WaddleAI Proxy Server",
     description="OpenAI-compatible API proxy with routing, security, and token management",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
 
-# Request metrics middleware
-@app.middleware("http")
-async def metrics_middleware(request: Request, call_next):
-    start_time = time.time()
-    
-    response = await call_next(request)
-    
-    # Record metrics
-    duration = time.time() - start_time
-    proxy_server.metrics.record_request(
-        endpoint=request.url.path,
-        method=request.method,
-        status_code=response.status_code,
-        duration=duration
-    )
-    
-    return response
-
-
-# Authentication dependency
-async def get_current_user(
-    request: Request,
-    authorization: Optional[str] = Header(None)
-):
+# Authentication, resolved before routing
+async def authenticate(authorization: Optional[str]):
     """Extract and validate user authentication"""
     try:
         if not authorization:
@@ -185,15 +306,22 @@ async def get_current_user(
         if authorization.startswith("Bearer "):
             # JWT token
             token = authorization[7:]
-            user_context = proxy_server.rbac.verify_jwt_token(token)
+            return proxy_server.rbac.verify_jwt_token(token)
         elif authorization.startswith("sk-") or authorization.startswith("wa-"):
-            # API key
+            # API key, checked against the database every time: this
+            # process's auth cache would keep a revoked key or a disabled
+            # user working until it expired
             api_key = authorization
-            user_context = proxy_server.rbac.authenticate_api_key(api_key)
+            return await proxy_server.singleflight.do(
+                ("auth", hashlib.sha256(api_key.encode()).digest()),
+                lambda: proxy_server.rbac.authenticate_api_key_async(
+                    api_key, proxy_server.db_run, use_cache=False
+                )
+            )
         else:
             raise HTTPException(status_code=401, detail="Invalid authorization format")
-        
-        return user_context
+    except HTTPException:
+        raise
     except AuthenticationError as e:
         raise HTTPException(status_code=401, detail=str(e))
     except Exception as e:
@@ -201,11 +329,111 @@ async def get_current_user(
         raise HTTPException(status_code=401, detail="Authentication failed")
 
 
+class ProxyASGI:
+    """Single pure ASGI layer in front of the proxy routes
+    
+    One call frame does what CORS, auth and metrics middlewares did
+    separately: answers preflights, adds CORS headers (every origin is
+    allowed), authenticates /v1/ and /api/ requests into request.state.user
+    and records request metrics from the response start message. Probes
+    and the metrics scrape go straight to the app.
+    """
+    
+    EXCLUDED_PATHS = frozenset({"/healthz", "/metrics"})
+    PROTECTED_PREFIXES = ("/v1/", "/api/")
+    PUBLIC_PATHS = frozenset({"/api/status"})
+    
+    PREFLIGHT_HEADERS = [
+        (b"access-control-allow-methods", b"DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT"),
+        (b"access-control-allow-credentials", b"true"),
+        (b"access-control-max-age", b"86400"),
+        (b"vary", b"Origin"),
+        (b"content-length", b"0"),
+    ]
+    
+    def __init__(self, app, metrics):
+        self.app = app
+        self.metrics = metrics
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.EXCLUDED_PATHS:
+            await self.app(scope, receive, send)
+            return
+        
+        path = scope["path"]
+        method = scope["method"]
+        
+        origin = authorization = request_method = request_headers = None
+        for name, value in scope["headers"]:
+            if name == b"origin":
+                origin = value
+            elif name == b"authorization":
+                authorization = value.decode("latin-1")
+            elif name == b"access-control-request-method":
+                request_method = value
+            elif name == b"access-control-request-headers":
+                request_headers = value
+        
+        # Preflight: nothing in the app is needed to answer it
+        if method == "OPTIONS" and origin is not None and request_method is not None:
+            headers = [(b"access-control-allow-origin", origin)] + self.PREFLIGHT_HEADERS
+            if request_headers:
+                headers.append((b"access-control-allow-headers", request_headers))
+            await send({"type": "http.response.start", "status": 204, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        
+        cors_headers = None
+        if origin is not None:
+            cors_headers = [
+                (b"access-control-allow-origin", origin),
+                (b"access-control-allow-credentials", b"true"),
+                (b"vary", b"Origin"),
+            ]
+        
+        start_time = time.perf_counter()
+        status_code = 500
+        
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if cors_headers:
+                    message["headers"] = list(message.get("headers", [])) + cors_headers
+            await send(message)
+        
+        try:
+            if path.startswith(self.PROTECTED_PREFIXES) and path not in self.PUBLIC_PATHS:
+                try:
+                    user_context = await authenticate(authorization)
+                except HTTPException as e:
+                    response = ORJSONResponse({"detail": e.detail}, status_code=e.status_code)
+                    await response(scope, receive, send_wrapper)
+                    return
+                scope.setdefault("state", {})["user"] = user_context
+            
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.metrics.record_request(
+                endpoint=path,
+                method=method,
+                status_code=status_code,
+                duration=time.perf_counter() - start_time
+            )
+
+
+app.add_middleware(ProxyASGI, metrics=proxy_metrics)
+
+
 # Health check endpoints
-@app.get("/healthz")
+# Probes get the same prebuilt response every time, with nothing to serialize
+_HEALTHY_RESPONSE = PlainTextResponse("healthy")
+
+
+@app.get("/healthz", response_class=PlainTextResponse)
 async def health_check():
     """Kubernetes-style health check"""
-    return "healthy"
+    return _HEALTHY_RESPONSE
 
 
 @app.get("/api/status")
@@ -213,7 +441,7 @@ async def detailed_status():
     """Detailed health status"""
     try:
         # Check database connectivity
-        proxy_server.db(proxy_server.db.users.id > 0).count()
+        await proxy_server.db_run(lambda: proxy_server.db(proxy_server.db.users.id > 0).count())
         
         # Check external dependencies
         dependencies = {
@@ -246,50 +474,190 @@ async def detailed_status():
 async def prometheus_metrics():
     """Prometheus metrics endpoint"""
     try:
-        metrics_data = proxy_server.metrics.get_metrics()
+        # Bursts of scrapes within a second share one registry collection
+        metrics_data = proxy_server.metrics.get_metrics_cached(max_age=1.0)
         return Response(
             content=metrics_data,
             media_type=CONTENT_TYPE_LATEST
         )
     except Exception as e:
-        logger.error(f"Metrics endpoint failed: {e}")
+        logger.error("Metrics endpoint failed", error=str(e))
         raise HTTPException(status_code=500, detail="Metrics unavailable")
 
 
+async def read_body(request: Request, max_bytes: int) -> bytes:
+    """Read the request body once, refusing anything over max_bytes with 413"""
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        raise HTTPException(status_code=413, detail="Request body too large")
+    
+    chunks = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > max_bytes:
+            raise HTTPException(status_code=413, detail="Request body too large")
+        chunks.append(chunk)
+    
+    # Later request.body() calls get the same bytes instead of re-reading
+    body = b"".join(chunks)
+    request._body = body
+    return body
+
+
+async def _read_json(request: Request) -> Dict[str, Any]:
+    """Parse the request body with orjson straight from the raw bytes"""
+    body = await read_body(request, proxy_server.config['max_request_bytes'])
+    try:
+        return orjson.loads(body)
+    except orjson.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Request body is not valid JSON")
+
+
+async def _finish_completion(
+    user_context, model, messages, prompt_text, response_text, routing_usage_info, session_id,
+    security_events=()
+):
+    """Account tokens, record metrics and store memory for a finished completion"""
+    # Extract provider and usage info from routing
+    actual_provider = routing_usage_info.get('provider', 'unknown')
+    input_tokens = routing_usage_info.get('input_tokens', 0)
+    output_tokens = routing_usage_info.get('output_tokens', 0)
+    
+    # Process token usage with actual provider
+    usage = await proxy_server.db_run(
+        proxy_server.token_manager.process_usage,
+        input_text=prompt_text,
+        output_text=response_text,
+        provider=actual_provider,
+        model=model,
+        api_key_id=user_context.api_key_id or 0,
+        user_id=user_context.user_id,
+        organization_id=user_context.organization_id,
+        actual_input_tokens=input_tokens,
+        actual_output_tokens=output_tokens
+    )
+    
+    # Update metrics
+    proxy_server.metrics.record_chat_completion(
+        provider=actual_provider,
+        model=model,
+        token_usage={
+            'input_tokens': input_tokens,
+            'output_tokens': output_tokens,
+            'waddleai_tokens': usage.waddleai_tokens,
+            'organization': user_context.organization_id,
+            'user': user_context.user_id
+        },
+        security_events=security_events
+    )
+    
+    # Store conversation in memory (asynchronously, don't block response)
+    proxy_server.spawn(proxy_server.memory_manager.add_conversation_turn(
+        user_id=user_context.user_id,
+        organization_id=user_context.organization_id,
+        messages=messages,  # Original messages without enhancement
+        response=response_text,
+        session_id=session_id,
+        metadata={
+            'model': model,
+            'provider': actual_provider,
+            'waddleai_tokens': usage.waddleai_tokens,
+            'llm_tokens_input': input_tokens,
+            'llm_tokens_output': output_tokens
+        }
+    ))
+    
+    return usage
+
+
+async def _stream_chat_completion(
+    user_context, model, messages, enhanced_messages, prompt_text, session_id, route_kwargs,
+    security_events
+):
+    """Relay provider output as OpenAI-style server-sent events"""
+    created = int(time.time())
+    completion_id = f"chatcmpl-{created}"
+    
+    def event(delta, finish_reason=None):
+        chunk = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+        }
+        return b"data: " + orjson.dumps(chunk) + b"\n\n"
+    
+    parts = []
+    usage_info = {}
+    try:
+        yield event({"role": "assistant"})
+        async for text in proxy_server.request_router.route_stream(
+            model=model,
+            messages=enhanced_messages,
+            usage_info=usage_info,
+            **route_kwargs
+        ):
+            parts.append(text)
+            yield event({"content": text})
+        yield event({}, usage_info.get('finish_reason', 'stop'))
+        yield b"data: [DONE]\n\n"
+    except Exception as e:
+        # Headers are already sent, so report the failure in-band
+        logger.error("LLM streaming failed", error=str(e))
+        yield b"data: " + orjson.dumps({'error': {'message': f'LLM routing failed: {e}', 'code': 503}}) + b"\n\n"
+    finally:
+        # Account whatever was delivered, even if the client went away;
+        # spawned so a cancelled stream can't interrupt the accounting
+        if parts:
+            proxy_server.spawn(_finish_completion(
+                user_context, model, messages, prompt_text,
+                "".join(parts), usage_info, session_id, security_events
+            ))
+        elif security_events:
+            proxy_server.metrics.record_chat_completion(security_events=security_events)
+
+
 # OpenAI Compatible API Endpoints
 @app.post("/v1/chat/completions")
-async def chat_completions(
-    request: Request,
-    user_context = Depends(get_current_user)
-):
+async def chat_completions(request: Request):
     """OpenAI-compatible chat completions endpoint"""
-    start_time = time.time()
+    user_context = request.state.user
+    # Request count and duration are recorded by ProxyASGI
     proxy_server.metrics.set_active_connections('requests_in_flight', 1)  # This would need proper tracking
     
+    # Recorded together with the LLM metrics once the request is settled
+    security_events = []
+    handed_off = False
+    
     try:
         # Parse request
-        body = await request.json()
+        body = await _read_json(request)
         messages = body.get("messages", [])
         model = body.get("model", "gpt-3.5-turbo")
         
-        # Combine messages for security scanning
-        prompt_text = "\n".join([msg.get("content", "") for msg in messages if msg.get("content")])
+        # Combine messages once for security scanning and token accounting
+        prompt_text = "\n".join(content for msg in messages if (content := msg.get("content")))
         
         # Security scanning
-        threats, sanitized_prompt = proxy_server.security_scanner.scan_prompt(
-            prompt_text,
-            user_id=user_context.user_id,
-            api_key_id=user_context.api_key_id,
-            ip_address=request.client.host
-        )
+        threats = []
+        if proxy_server.security_scanner.policy.enabled:
+            threats, sanitized_prompt = await proxy_server.db_run(
+                proxy_server.security_scanner.scan_prompt,
+                prompt_text,
+                user_id=user_context.user_id,
+                api_key_id=user_context.api_key_id,
+                ip_address=request.client.host
+            )
         
         # Handle security threats
         for threat in threats:
-            proxy_server.metrics.record_security_event(
-                event_type=threat.threat_type.value,
-                severity=threat.severity.value,
-                action=threat.suggested_action.value
-            )
+            security_events.append((
+                threat.threat_type.value,
+                threat.severity.value,
+                threat.suggested_action.value
+            ))
             
             if threat.suggested_action == Action.BLOCK:
                 raise HTTPException(
@@ -297,8 +665,11 @@ async def chat_completions(
                     detail=f"Request blocked due to security threat: {threat.description}"
                 )
         
-        # Check quota
-        quota_ok, quota_info = proxy_server.token_manager.check_quota(user_context.api_key_id)
+        # Check quota; concurrent requests on one key share the lookup
+        quota_ok, quota_info = await proxy_server.singleflight.do(
+            ("quota", user_context.api_key_id),
+            lambda: proxy_server.db_run(proxy_server.token_manager.check_quota, user_context.api_key_id)
+        )
         if not quota_ok:
             raise HTTPException(
                 status_code=429,
@@ -322,73 +693,46 @@ async def chat_completions(
             context=conversation_context
         )
         
+        route_kwargs = {
+            k: v for k, v in body.items() if k not in ['messages', 'model', 'session_id', 'stream']
+        }
+        
+        if body.get("stream"):
+            handed_off = True
+            return StreamingResponse(
+                _stream_chat_completion(
+                    user_context, model, messages, enhanced_messages,
+                    prompt_text, session_id, route_kwargs, security_events
+                ),
+                media_type="text/event-stream"
+            )
+        
         # Route request to appropriate LLM provider
         try:
             response_text, routing_usage_info = await proxy_server.request_router.route_request(
                 model=model,
                 messages=enhanced_messages,
-                **{k: v for k, v in body.items() if k not in ['messages', 'model', 'session_id']}
+                **route_kwargs
             )
         except Exception as e:
-            logger.error(f"LLM routing failed: {e}")
+            logger.error("LLM routing failed", error=str(e))
             raise HTTPException(
                 status_code=503,
                 detail=f"LLM routing failed: {str(e)}"
             )
         
-        # Extract provider and usage info from routing
-        actual_provider = routing_usage_info.get('provider', 'unknown')
-        input_tokens = routing_usage_info.get('input_tokens', 0)
-        output_tokens = routing_usage_info.get('output_tokens', 0)
-        
-        # Process token usage with actual provider
-        usage = proxy_server.token_manager.process_usage(
-            input_text=prompt_text,
-            output_text=response_text,
-            provider=actual_provider,
-            model=model,
-            api_key_id=user_context.api_key_id or 0,
-            user_id=user_context.user_id,
-            organization_id=user_context.organization_id,
-            actual_input_tokens=input_tokens,
-            actual_output_tokens=output_tokens
-        )
-        
-        # Update metrics
-        proxy_server.metrics.record_llm_request(
-            provider=actual_provider,
-            model=model,
-            status="success",
-            token_usage={
-                'input_tokens': input_tokens,
-                'output_tokens': output_tokens,
-                'waddleai_tokens': usage.waddleai_tokens,
-                'organization': user_context.organization_id,
-                'user': user_context.user_id
-            }
+        handed_off = True
+        usage = await _finish_completion(
+            user_context, model, messages, prompt_text,
+            response_text, routing_usage_info, session_id, security_events
         )
         
-        # Store conversation in memory (asynchronously, don't block response)
-        asyncio.create_task(proxy_server.memory_manager.add_conversation_turn(
-            user_id=user_context.user_id,
-            organization_id=user_context.organization_id,
-            messages=messages,  # Original messages without enhancement
-            response=response_text,
-            session_id=session_id,
-            metadata={
-                'model': model,
-                'provider': actual_provider,
-                'waddleai_tokens': usage.waddleai_tokens,
-                'llm_tokens_input': input_tokens,
-                'llm_tokens_output': output_tokens
-            }
-        ))
-        
         # Return OpenAI-compatible response
+        created = int(time.time())
         response = {
-            "id": f"chatcmpl-{int(time.time())}",
+            "id": f"chatcmpl-{created}",
             "object": "chat.completion",
-            "created": int(time.time()),
+            "created": created,
             "model": model,
             "choices": [{
                 "index": 0,
@@ -406,89 +750,77 @@ async def chat_completions(
             }
         }
         
-        REQUEST_COUNT.labels(method="POST", endpoint="chat_completions", status="200").inc()
-        return response
+        # Returned as a Response so FastAPI skips its jsonable_encoder pass
+        return ORJSONResponse(response)
         
     except HTTPException:
-        REQUEST_COUNT.labels(method="POST", endpoint="chat_completions", status="400").inc()
         raise
     except Exception as e:
         logger.error("Chat completion failed", error=str(e), user=user_context.username)
-        REQUEST_COUNT.labels(method="POST", endpoint="chat_completions", status="500").inc()
         raise HTTPException(status_code=500, detail="Internal server error")
     finally:
-        duration = time.time() - start_time
-        proxy_server.metrics.record_request(
-            endpoint="/v1/chat/completions",
-            method="POST",
-            status_code=200,  # This should be dynamic based on response
-            duration=duration
-        )
+        # Blocked or failed before reaching an LLM: only the threats to record
+        if not handed_off and security_events:
+            proxy_server.metrics.record_chat_completion(security_events=security_events)
 
 
 @app.get("/v1/models")
-async def list_models(user_context = Depends(get_current_user)):
+async def list_models(request: Request):
     """List available models"""
     try:
         # Get actual available models from connection links
-        models = await proxy_server.llm_manager.list_all_models()
-        
-        # If no models available, return empty list
-        if not models:
-            models = []
+        models = await proxy_server.list_models_cached()
         
-        return {
+        return ORJSONResponse({
             "object": "list",
             "data": models
-        }
+        })
     except Exception as e:
         logger.error("Failed to list models", error=str(e))
         raise HTTPException(status_code=500, detail="Failed to list models")
 
 
 @app.get("/api/routing/stats")
-async def get_routing_stats(user_context = Depends(get_current_user)):
+async def get_routing_stats(request: Request):
     """Get LLM provider routing statistics"""
     try:
-        stats = proxy_server.request_router.get_provider_stats()
-        return {
-            "routing_strategy": proxy_server.request_router.default_strategy.value,
-            "provider_stats": stats
-        }
+        return proxy_server.routing_stats_cached()
     except Exception as e:
-        logger.error(f"Failed to get routing stats: {e}")
+        logger.error("Failed to get routing stats", error=str(e))
         raise HTTPException(status_code=500, detail="Failed to get routing stats")
 
 
 @app.post("/api/routing/strategy")
-async def set_routing_strategy(
-    request: Request,
-    user_context = Depends(get_current_user)
-):
+async def set_routing_strategy(request: Request):
     """Set routing strategy (Admin only)"""
+    user_context = request.state.user
     try:
         # Check admin permission
-        if not proxy_server.rbac.check_permission(user_context, Permission.ADMIN_MANAGE):
+        if not user_context.has_permission(Permission.SYSTEM_CONFIG):
             raise HTTPException(status_code=403, detail="Admin permission required")
         
-        body = await request.json()
+        body = await _read_json(request)
         strategy_name = body.get("strategy")
         
         try:
             strategy = RoutingStrategy(strategy_name)
             proxy_server.request_router.set_routing_strategy(strategy)
+            proxy_server.invalidate_routing_stats()
             return {"status": "success", "strategy": strategy.value}
         except ValueError:
             raise HTTPException(status_code=400, detail=f"Invalid strategy: {strategy_name}")
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Failed to set routing strategy: {e}")
+        logger.error("Failed to set routing strategy", error=str(e))
         raise HTTPException(status_code=500, detail="Failed to set routing strategy")
 
 
 @app.get("/api/memory/stats")
-async def get_memory_stats(user_context = Depends(get_current_user)):
+async def get_memory_stats(request: Request):
     """Get memory statistics for current user"""
+    user_context = request.state.user
     try:
         stats = await proxy_server.memory_manager.get_memory_stats(
             user_id=user_context.user_id,
@@ -496,19 +828,17 @@ async def get_memory_stats(user_context = Depends(get_current_user)):
         )
         return stats
     except Exception as e:
-        logger.error(f"Failed to get memory stats: {e}")
+        logger.error("Failed to get memory stats", error=str(e))
         raise HTTPException(status_code=500, detail="Failed to get memory stats")
 
 
 @app.delete("/api/memory/cleanup")
-async def cleanup_old_memories(
-    days: int = 90,
-    user_context = Depends(get_current_user)
-):
+async def cleanup_old_memories(request: Request, days: int = 90):
     """Cleanup old memories (Admin only or own memories)"""
+    user_context = request.state.user
     try:
         # Admin can cleanup all memories, users can only cleanup their own
-        if proxy_server.rbac.check_permission(user_context, Permission.ADMIN_MANAGE):
+        if user_context.has_permission(Permission.SYSTEM_CONFIG):
             cleaned = await proxy_server.memory_manager.cleanup_old_memories(days)
             return {"cleaned_memories": cleaned, "scope": "system"}
         else:
@@ -519,29 +849,34 @@ async def cleanup_old_memories(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Failed to cleanup memories: {e}")
+        logger.error("Failed to cleanup memories", error=str(e))
         raise HTTPException(status_code=500, detail="Failed to cleanup memories")
 
 
 @app.get("/api/usage")
-async def get_usage(user_context = Depends(get_current_user)):
+async def get_usage(request: Request):
     """Get current API key usage stats"""
+    user_context = request.state.user
     try:
-        stats = proxy_server.token_manager.get_usage_stats(
+        stats = await proxy_server.db_run(
+            proxy_server.token_manager.get_usage_stats,
             api_key_id=user_context.api_key_id,
             days=30
         )
-        return stats
+        return ORJSONResponse(stats)
     except Exception as e:
         logger.error("Failed to get usage stats", error=str(e))
         raise HTTPException(status_code=500, detail="Failed to get usage stats")
 
 
 @app.get("/api/quota")
-async def get_quota(user_context = Depends(get_current_user)):
+async def get_quota(request: Request):
     """Get remaining quota for API key"""
+    user_context = request.state.user
     try:
-        quota_ok, quota_info = proxy_server.token_manager.check_quota(user_context.api_key_id)
+        quota_ok, quota_info = await proxy_server.db_run(
+            proxy_server.token_manager.check_quota, user_context.api_key_id
+        )
         return {
             "quota_ok": quota_ok,
             **quota_info
@@ -552,11 +887,14 @@ async def get_quota(user_context = Depends(get_current_user)):
 
 
 if __name__ == "__main__":
-    # Development server
+    # Auto-reload is for development only (DEV=1)
     uvicorn.run(
         "main:app",
         host=os.getenv("HOST", "0.0.0.0"),
         port=int(os.getenv("PORT", "8000")),
-        reload=True,
+        reload=os.getenv("DEV") == "1",
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.getenv("WORKERS", "1")),
         log_level="info"
     )
\ No newline at end of file
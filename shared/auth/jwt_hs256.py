@@ -0,0 +1,114 @@
+"""
+Minimal HS256 JSON Web Tokens
+Signs and verifies with a prepared OpenSSL-backed HMAC and orjson,
+skipping PyJWT's generic algorithm registry and claim machinery
+"""
+
+import binascii
+import hmac
+import time
+from calendar import timegm
+from datetime import datetime
+from typing import Any, Dict
+
+import orjson
+
+
+class InvalidTokenError(Exception):
+    """Token is malformed or its signature does not match"""
+    pass
+
+
+class ExpiredSignatureError(InvalidTokenError):
+    """Token signature is valid but the token has expired"""
+    pass
+
+
+# base64 <-> base64url alphabet tables, applied around the binascii codecs
+_TO_URLSAFE = bytes.maketrans(b"+/", b"-_")
+_FROM_URLSAFE = bytes.maketrans(b"-_", b"+/")
+
+
+def _b64encode(data: bytes) -> bytes:
+    """Unpadded base64url, as JWT requires"""
+    return binascii.b2a_base64(data, newline=False).translate(_TO_URLSAFE).rstrip(b"=")
+
+
+def _b64decode(data: bytes) -> bytes:
+    """Decode unpadded base64url"""
+    return binascii.a2b_base64(data.translate(_FROM_URLSAFE) + b"=" * (-len(data) % 4))
+
+
+# Every token shares the same header: {"alg":"HS256","typ":"JWT"}, which is
+# also byte-for-byte what PyJWT emits, so its tokens skip header parsing too
+_HEADER = b"eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9"
+
+# Registered time claims; datetimes are converted to epoch seconds
+_TIME_CLAIMS = ("exp", "iat", "nbf")
+
+
+def _split(token: str) -> tuple:
+    """Split a token into its raw segments"""
+    header, payload, signature = token.encode("ascii").split(b".")
+    return header, payload, signature
+
+
+def decode_unverified(token: str) -> Dict[str, Any]:
+    """Read the claims without checking the signature or expiry"""
+    try:
+        return orjson.loads(_b64decode(_split(token)[1]))
+    except ValueError:
+        raise InvalidTokenError("Malformed token")
+
+
+class HS256Signer:
+    """Encode and verify HS256 tokens for one fixed secret"""
+    
+    def __init__(self, secret: str):
+        # Keyed once; each signature copies the prepared inner/outer state
+        # instead of redoing the key schedule
+        self._hmac = hmac.new(secret.encode(), digestmod="sha256")
+    
+    def _sign(self, signing_input: bytes) -> bytes:
+        mac = self._hmac.copy()
+        mac.update(signing_input)
+        return mac.digest()
+    
+    def encode(self, payload: Dict[str, Any]) -> str:
+        """Sign payload and return the compact token"""
+        claims = dict(payload)
+        for claim in _TIME_CLAIMS:
+            value = claims.get(claim)
+            if isinstance(value, datetime):
+                claims[claim] = timegm(value.utctimetuple())
+        
+        signing_input = _HEADER + b"." + _b64encode(orjson.dumps(claims))
+        return (signing_input + b"." + _b64encode(self._sign(signing_input))).decode("ascii")
+    
+    def decode(self, token: str) -> Dict[str, Any]:
+        """Verify the signature and time claims and return the payload"""
+        try:
+            header, payload, signature = _split(token)
+            
+            if header != _HEADER and orjson.loads(_b64decode(header)).get("alg") != "HS256":
+                raise InvalidTokenError("Unsupported algorithm")
+            
+            expected = self._sign(header + b"." + payload)
+            if not hmac.compare_digest(expected, _b64decode(signature)):
+                raise InvalidTokenError("Signature verification failed")
+            
+            claims = orjson.loads(_b64decode(payload))
+            if not isinstance(claims, dict):
+                raise InvalidTokenError("Malformed token")
+            
+            now = time.time()
+            exp = claims.get("exp")
+            if exp is not None and exp <= now:
+                raise ExpiredSignatureError("Token has expired")
+            nbf = claims.get("nbf")
+            if nbf is not None and nbf > now:
+                raise InvalidTokenError("Token is not yet valid")
+        except (ValueError, TypeError, AttributeError):
+            raise InvalidTokenError("Malformed token")
+        
+        return claims
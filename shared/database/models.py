@@ -8,13 +8,31 @@ from datetime import datetime, date
 import os
 
 
-def get_db(db_uri=None):
-    """Initialize database connection with all models"""
+def get_db(db_uri=None, pool_size=None, migrate=None):
+    """Initialize database connection with all models
+    
+    With migrate off (DB_MIGRATE=false) tables are only declared, not
+    checked or altered, and indexes are left alone; run
+    `python -m shared.database.models` once to migrate instead.
+    """
     if db_uri is None:
         db_uri = os.getenv('DATABASE_URL', 'sqlite://waddleai.db')
+    if pool_size is None:
+        pool_size = int(os.getenv('DB_POOL_SIZE', '10'))
+    if migrate is None:
+        migrate = os.getenv('DB_MIGRATE', 'true').lower() == 'true'
     
-    db = DAL(db_uri, migrate=True, fake_migrate_all=False)
+    db = DAL(
+        db_uri,
+        pool_size=pool_size,
+        migrate=migrate,
+        fake_migrate_all=False,
+        lazy_tables=True,
+        check_reserved=None
+    )
     define_tables(db)
+    if migrate:
+        define_indexes(db)
     return db
 
 
@@ -136,6 +154,13 @@ def define_tables(db):
         Field('llm_tokens', 'json'),  # {"openai_gpt4": {"input": 100, "output": 50}, "claude": {...}}
         Field('tokens_input_total', 'integer', default=0),  # Sum across all LLMs
         Field('tokens_output_total', 'integer', default=0), # Sum across all LLMs
+        # Per-provider counts for the common providers, so totals don't need llm_tokens
+        Field('tokens_openai_input', 'integer', default=0),
+        Field('tokens_openai_output', 'integer', default=0),
+        Field('tokens_anthropic_input', 'integer', default=0),
+        Field('tokens_anthropic_output', 'integer', default=0),
+        Field('tokens_ollama_input', 'integer', default=0),
+        Field('tokens_ollama_output', 'integer', default=0),
         Field('request_count', 'integer', default=0),
         Field('last_updated', 'datetime', default=datetime.utcnow)
     )
@@ -194,6 +219,42 @@ def define_tables(db):
     return db
 
 
+# Columns the management and proxy servers filter usage and key lookups on.
+# Composite indexes cover the enabled filter on credential lookups, the
+# range scans over usage and security logs, and the per-key, per-user and
+# per-IP threat counts behind security rate limiting.
+INDEXES = [
+    ('token_usage', ('date',)),
+    ('token_usage', ('organization_id',)),
+    ('token_usage', ('user_id',)),
+    ('token_usage', ('organization_id', 'date')),
+    ('api_keys', ('user_id',)),
+    ('api_keys', ('organization_id',)),
+    ('api_keys', ('key_id', 'enabled')),
+    ('users', ('username', 'enabled')),
+    ('usage_logs', ('timestamp',)),
+    ('security_logs', ('timestamp', 'organization_id')),
+    ('security_logs', ('api_key_id', 'timestamp')),
+    ('security_logs', ('user_id', 'timestamp')),
+    ('security_logs', ('ip_address', 'timestamp')),
+]
+
+
+def define_indexes(db):
+    """Create secondary indexes, skipping any that already exist
+    
+    Uses CREATE INDEX IF NOT EXISTS (PostgreSQL and SQLite), so existing
+    indexes cost nothing and any other error propagates.
+    """
+    for table_name, field_names in INDEXES:
+        table = db[table_name]
+        index_name = f"idx_{table_name}_{'_'.join(field_names)}"
+        columns = ", ".join(table[name]._rname for name in field_names)
+        db.executesql(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table._rname} ({columns});")
+    db.commit()
+    return db
+
+
 def init_default_data(db):
     """Initialize default data for the database"""
     
@@ -210,11 +271,11 @@ def init_default_data(db):
 
     # Create admin user if doesn't exist
     if not db(db.users.username == 'admin').select():
-        from passlib.hash import bcrypt
+        from shared.auth.rbac import hash_password
         admin_id = db.users.insert(
             username='admin',
             email='admin@waddleai.local',
-            password_hash=bcrypt.hash('admin123'),  # Change in production!
+            password_hash=hash_password('admin123'),  # Change in production!
             role='admin',
             organization_id=org_id,
             token_quota_monthly=999999999,
@@ -223,11 +284,12 @@ def init_default_data(db):
 
         # Create admin API key
         import secrets
-        api_key = 'wa-' + secrets.token_urlsafe(32)
-        api_key_hash = bcrypt.hash(api_key)
+        key_id = secrets.token_hex(8)
+        api_key = f"wa-{key_id}-{secrets.token_urlsafe(32)}"
+        api_key_hash = hash_password(api_key)
         
         db.api_keys.insert(
-            key_id=f"admin-key-{secrets.token_hex(8)}",
+            key_id=key_id,
             key_hash=api_key_hash,
             user_id=admin_id,
             organization_id=org_id,
@@ -264,8 +326,8 @@ def init_default_data(db):
 
 
 if __name__ == '__main__':
-    # Test database creation
-    db = get_db()
+    # One-off migration: create/alter tables and indexes, seed defaults
+    db = get_db(migrate=True)
     init_default_data(db)
     print("Database initialized successfully!")
     print(f"Tables: {', '.join(db.tables)}")
\ No newline at end of file
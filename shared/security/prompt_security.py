@@ -5,15 +5,138 @@ Detects and prevents prompt injection attacks and malicious content
 
 import re
 import json
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, FrozenSet, List, Set, Tuple, Optional
 from enum import Enum
 from dataclasses import dataclass
+import functools
 import hashlib
-from datetime import datetime
+import queue
+import struct
+import threading
+import time
+from datetime import datetime, timedelta
 import logging
 
+# Optional Hyperscan import (multi-pattern SIMD matcher, x86-64 only)
+try:
+    import hyperscan
+    HAS_HYPERSCAN = True
+except ImportError:
+    hyperscan = None
+    HAS_HYPERSCAN = False
+
+# Optional Aho-Corasick import (one-pass multi-literal search)
+try:
+    import ahocorasick
+    HAS_AHOCORASICK = True
+except ImportError:
+    ahocorasick = None
+    HAS_AHOCORASICK = False
+
+# Optional RE2 import (linear-time automaton matching, no backtracking)
+try:
+    import re2
+    HAS_RE2 = True
+except ImportError:
+    re2 = None
+    HAS_RE2 = False
+
 logger = logging.getLogger(__name__)
 
+# Counted repeats such as {20,} or {10,}
+_COUNTED_REPEAT = re.compile(r'\{(\d+),\d*\}')
+
+# Span between a delimiter pattern's opener and closer
+_SPAN = '.*'
+
+# Escapes and runs of uppercase letters in a pattern
+_PATTERN_UPPERCASE = re.compile(r'\\.|[A-Z]+')
+
+# re.IGNORECASE matches both Turkish i's against "i", casefold() does not
+_FOLD_DOTTED_I = str.maketrans({'\u0130': 'i', '\u0131': 'i'})
+
+# Match threat patterns with RE2 when it is installed; set False to force re
+USE_RE2 = True
+
+
+def compile_threat_pattern(pattern: str, ignore_case: bool = True, ascii_only: bool = False):
+    """Compile a threat pattern, preferring RE2 over the backtracking re engine
+    
+    RE2's \\s and \\w only match ASCII, so a non-breaking space would slip
+    past its patterns; RE2 is only used when ascii_only says the pattern
+    never sees anything but ASCII subjects.
+    """
+    if ascii_only and USE_RE2 and HAS_RE2:
+        try:
+            # google-re2 takes no flags argument; inline flags work in both
+            flags = "(?ims)" if ignore_case else "(?ms)"
+            return re2.compile(f"{flags}{pattern}")
+        except Exception as e:
+            logger.warning(f"RE2 rejected threat pattern, using re: {e}")
+    flags = re.MULTILINE | re.DOTALL
+    return re.compile(pattern, flags | re.IGNORECASE if ignore_case else flags)
+
+
+def _split_span(pattern: str) -> Tuple[str, Optional[str]]:
+    """Split a delimiter pattern opener.*closer into (opener, closer), or (pattern, None)"""
+    opener, span, closer = pattern.partition(_SPAN)
+    return (opener, closer) if span else (pattern, None)
+
+
+class _SpannedPattern:
+    """A compiled opener.*closer pattern, matched in linear time on any engine
+    
+    The greedy span runs from the first opener to the furthest closer, so
+    every match ends where the last closer does. Cutting the subject there
+    stops re from rescanning the rest of the prompt after every opener that
+    has no closer, e.g. in "{{" * 4000, without changing what matches.
+    """
+    
+    __slots__ = ('pattern', 'closer')
+    
+    def __init__(self, pattern, closer):
+        self.pattern = pattern
+        self.closer = closer
+    
+    def _end(self, subject: str) -> int:
+        """End of the furthest closer in subject, or -1 without one"""
+        end = -1
+        match = self.closer.search(subject)
+        while match is not None:
+            end = max(end, match.end())
+            # Closers may overlap, as "}}" does in "}}}", so the next one is
+            # looked for one character on
+            match = self.closer.search(subject, match.start() + 1)
+        return end
+    
+    def search(self, subject: str):
+        end = self._end(subject)
+        return self.pattern.search(subject[:end]) if end >= 0 else None
+    
+    def finditer(self, subject: str):
+        end = self._end(subject)
+        return self.pattern.finditer(subject[:end]) if end >= 0 else iter(())
+    
+    def sub(self, replacement: str, subject: str) -> str:
+        end = self._end(subject)
+        return self.pattern.sub(replacement, subject[:end]) + subject[end:] if end >= 0 else subject
+
+
+def _compile_source_pattern(pattern: str, ignore_case: bool = True, ascii_only: bool = False):
+    """Compile a threat pattern on its own, delimiter spans included"""
+    compiled = compile_threat_pattern(pattern, ignore_case, ascii_only)
+    closer = _split_span(pattern)[1]
+    if closer is None:
+        return compiled
+    return _SpannedPattern(compiled, compile_threat_pattern(closer, ignore_case, ascii_only))
+
+
+def _lowercase_pattern(pattern: str) -> str:
+    """Lowercase a pattern's literal text, leaving escapes such as \\S alone"""
+    return _PATTERN_UPPERCASE.sub(
+        lambda m: m.group(0) if m.group(0).startswith('\\') else m.group(0).lower(), pattern
+    )
+
 
 class ThreatType(Enum):
     """Types of security threats"""
@@ -32,6 +155,13 @@ class Severity(Enum):
     CRITICAL = "critical"
 
 
+# Severities from least to most severe
+_SEVERITY_ORDER = list(Severity)
+
+# Each severity raised one level, for types matched many times
+_ESCALATED_SEVERITY = dict(zip(_SEVERITY_ORDER, _SEVERITY_ORDER[1:] + _SEVERITY_ORDER[-1:]))
+
+
 class Action(Enum):
     """Security response actions"""
     LOG = "log"
@@ -40,18 +170,18 @@ class Action(Enum):
     RATE_LIMIT = "rate_limit"
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ThreatDetection:
     """Result of threat detection"""
     threat_type: ThreatType
     severity: Severity
     confidence: float
-    matched_patterns: List[str]
+    matched_patterns: Tuple[str, ...]
     description: str
     suggested_action: Action
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class SecurityPolicy:
     """Security policy configuration"""
     name: str
@@ -62,10 +192,87 @@ class SecurityPolicy:
     rate_limit_threshold: int
 
 
+class ThreatLogWriter:
+    """Background thread that writes security logs in batches
+    
+    Scans only enqueue their rows; the thread drains up to max_batch rows
+    or max_delay seconds' worth and hands them to write_batch in one call,
+    so scans never wait on the database. The queue is bounded: under an
+    attack burst, rows beyond max_queue are dropped rather than buffered.
+    """
+    
+    def __init__(self, db, write_batch, max_queue: int = 10000, max_batch: int = 500, max_delay: float = 0.1):
+        self.db = db
+        self.write_batch = write_batch
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='threat-log-writer', daemon=True)
+    
+    def start(self):
+        self._thread.start()
+    
+    def submit(self, row: Dict) -> bool:
+        """Queue one security log row; False if the queue is full"""
+        try:
+            self._queue.put_nowait(row)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+    
+    def close(self, timeout: float = 10.0):
+        """Write everything already queued, then stop the thread
+        
+        Stopping is signalled with an event rather than through the queue,
+        so closing never waits for room in a full queue.
+        """
+        self._stopping.set()
+        self._thread.join(timeout)
+    
+    def _run(self):
+        while True:
+            # Read before draining, so rows queued before close() are written
+            stopping = self._stopping.is_set()
+            try:
+                batch = [self._queue.get(timeout=self.max_delay)]
+            except queue.Empty:
+                if stopping:
+                    return
+                continue
+            
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write(batch)
+    
+    def _write(self, batch: List[Dict]):
+        try:
+            self.write_batch(batch)
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Failed to write {len(batch)} security logs: {e}")
+
+
 class PromptSecurityScanner:
     """Comprehensive prompt security scanner"""
     
-    # Threat detection patterns
+    # Matches kept per detection, and counted per threat type before the
+    # scan of that type stops
+    MAX_REPORTED_MATCHES = 5
+    MAX_COUNTED_MATCHES = 1000
+    
+    # Threat detection patterns. A delimiter pattern has at most one .*
+    # span, between its opener and its closer; see _SpannedPattern.
     THREAT_PATTERNS = {
         ThreatType.PROMPT_INJECTION: [
             r'ignore\s+(?:previous|all|above|prior)\s+(?:instructions?|prompts?|rules?|directions?)',
@@ -114,7 +321,7 @@ class PromptSecurityScanner:
             r'###\s+(?:System|Instruction|Human|Assistant)',
             r'\[INST\].*\[/INST\]',
             r'<s>.*</s>',
-            r'{{.*}}',
+            r'\{\{.*\}\}',
         ],
         
         ThreatType.CREDENTIAL_HARVESTING: [
@@ -128,6 +335,36 @@ class PromptSecurityScanner:
         ]
     }
     
+    # Literals every match of the pattern at the same index must contain (any
+    # one of them), lowercase; a prompt with none of a type's literals skips it
+    THREAT_LITERALS = {
+        ThreatType.PROMPT_INJECTION: [
+            ('ignore',), ('forget',), ('system',), ('</',), ('---',),
+            ('new',), ('override',), ('disregard',), ('replace',), ('instead',),
+        ],
+        
+        ThreatType.JAILBREAK: [
+            ('pretend',), ('roleplay',), ('simulate',), ('act',), ('bypass',), ('break',),
+            ('violate',), ('against',), ('anything',), ('there',), ('hypothetically',),
+            ('fictional', 'hypothetical'),
+        ],
+        
+        ThreatType.DATA_EXTRACTION: [
+            ('prompt', 'instruction'), ('what',), ('reveal',), ('display',),
+            ('print',), ('output',), ('what',), ('paste',),
+        ],
+        
+        ThreatType.SYSTEM_PROMPT_LEAK: [
+            ('<|im_',), ('<|system|>',), ('<|user|>',), ('<|assistant|>',),
+            ('###',), ('[inst]',), ('<s>',), ('{{',),
+        ],
+        
+        ThreatType.CREDENTIAL_HARVESTING: [
+            ('api',), ('pass', 'pwd'), ('token',), ('secret',), ('user', 'login'),
+            ('sk-',), ('xoxb-',),
+        ]
+    }
+    
     # Security policies
     SECURITY_POLICIES = {
         "strict": SecurityPolicy(
@@ -176,17 +413,267 @@ class PromptSecurityScanner:
         )
     }
     
-    def __init__(self, db, policy_name: str = "balanced"):
+    # Severity of each threat type before escalation
+    _BASE_SEVERITY = {
+        ThreatType.PROMPT_INJECTION: Severity.HIGH,
+        ThreatType.JAILBREAK: Severity.MEDIUM,
+        ThreatType.DATA_EXTRACTION: Severity.HIGH,
+        ThreatType.SYSTEM_PROMPT_LEAK: Severity.CRITICAL,
+        ThreatType.CREDENTIAL_HARVESTING: Severity.CRITICAL,
+    }
+    
+    # Replacement for each match of a threat type when sanitizing
+    _REDACTION = {
+        ThreatType.PROMPT_INJECTION: "[REDACTED: Instruction override attempt]",
+        ThreatType.JAILBREAK: "[REDACTED: Roleplay attempt]",
+        ThreatType.DATA_EXTRACTION: "[REDACTED: System information request]",
+        ThreatType.SYSTEM_PROMPT_LEAK: "[REDACTED: System token]",
+        ThreatType.CREDENTIAL_HARVESTING: "[REDACTED: Credential]",
+    }
+    
+    def __init__(
+        self,
+        db,
+        policy_name: str = "balanced",
+        scan_cache_size: int = 4096,
+        scan_cache_bytes: int = 16 * 1024 * 1024,
+        org_cache_ttl: float = 300.0,
+        org_cache_size: int = 10000
+    ):
         self.db = db
         self.policy = self.SECURITY_POLICIES.get(policy_name, self.SECURITY_POLICIES["balanced"])
         
-        # Compile regex patterns for performance
-        self.compiled_patterns = {}
-        for threat_type, patterns in self.THREAT_PATTERNS.items():
-            self.compiled_patterns[threat_type] = [
-                re.compile(pattern, re.IGNORECASE | re.MULTILINE | re.DOTALL)
+        # (action, base severity) per threat type under this policy
+        self._policy_table: Dict[ThreatType, Tuple[Action, Severity]] = {
+            threat_type: (
+                self.policy.actions.get(threat_type, Action.LOG),
+                self._BASE_SEVERITY.get(threat_type, Severity.LOW)
+            )
+            for threat_type in ThreatType
+        }
+        self.log_writer: Optional[ThreatLogWriter] = None
+        
+        # (user_id, api_key_id) -> (expires_at, (organization_id, user_id));
+        # a key's owner and organization rarely change
+        self.org_cache_ttl = org_cache_ttl
+        self.org_cache_size = org_cache_size
+        self._org_cache: Dict[tuple, tuple] = {}
+        self._org_cache_lock = threading.Lock()
+        
+        # Scan results by prompt digest, least recently used first, with the
+        # characters of text each one holds; bounded by both count and size,
+        # as sanitized prompts can be as long as the policy allows
+        self.scan_cache_size = scan_cache_size
+        self.scan_cache_bytes = scan_cache_bytes
+        self._scan_cache: Dict[bytes, tuple] = {}
+        self._scan_cache_used = 0
+        self._scan_cache_lock = threading.Lock()
+        
+        # Patterns, literals and the Hyperscan database are compiled once per
+        # class and shared by every scanner
+        self.fused_patterns = self._compile_fused_patterns(False)
+        self.lowered_patterns = self._compile_fused_patterns(True)
+        self.source_patterns = self._compile_source_patterns(False)
+        self.lowered_source_patterns = self._compile_source_patterns(True)
+        self._literal_types, self._literal_automaton = self._compile_literals()
+        
+        # Hyperscan matches every pattern in one pass over the prompt; the
+        # fused regexes are only used without it, and for sanitization
+        self._hs_db, self._hs_ids, self._hs_prefilter_ids = self._compile_hyperscan()
+        self._hs_local = threading.local()
+    
+    @classmethod
+    @functools.cache
+    def _compile_fused_patterns(cls, lowered: bool) -> Dict[ThreatType, object]:
+        """Compile one alternation per threat type, so a scan walks the prompt once per type
+        
+        Each alternative is named p<index> after its source pattern. Lowered
+        patterns are case-sensitive and only match lowercased ASCII prompts,
+        so only they may use RE2.
+        Delimiter patterns are cut down to their opener, so the fused pattern
+        stays linear and only tells whether the type may match.
+        """
+        fix_case = _lowercase_pattern if lowered else str
+        return {
+            threat_type: compile_threat_pattern(
+                "|".join(
+                    f"(?P<p{index}>{fix_case(_split_span(pattern)[0])})" for index, pattern in enumerate(patterns)
+                ),
+                ignore_case=not lowered, ascii_only=lowered
+            )
+            for threat_type, patterns in cls.THREAT_PATTERNS.items()
+        }
+    
+    @classmethod
+    @functools.cache
+    def _compile_source_patterns(cls, lowered: bool) -> Dict[ThreatType, Tuple[object, ...]]:
+        """Compile every threat pattern on its own, for counting matches per pattern"""
+        fix_case = _lowercase_pattern if lowered else str
+        return {
+            threat_type: tuple(
+                _compile_source_pattern(fix_case(pattern), ignore_case=not lowered, ascii_only=lowered)
                 for pattern in patterns
-            ]
+            )
+            for threat_type, patterns in cls.THREAT_PATTERNS.items()
+        }
+    
+    @classmethod
+    @functools.cache
+    def _compile_master_pattern(cls, threat_types: FrozenSet[ThreatType], lowered: bool):
+        """Compile one alternation over every pattern of the given threat types
+        
+        Only used to ask whether anything matches at all: in a single
+        finditer a match of one type can swallow another's, e.g. {{...}}
+        around an injection, so counting still runs per type. Like the fused
+        patterns, delimiter patterns only contribute their opener.
+        """
+        fix_case = _lowercase_pattern if lowered else str
+        return compile_threat_pattern("|".join(
+            f"(?:{fix_case(_split_span(pattern)[0])})"
+            for threat_type, patterns in cls.THREAT_PATTERNS.items() if threat_type in threat_types
+            for pattern in patterns
+        ), ignore_case=not lowered, ascii_only=lowered)
+    
+    @classmethod
+    @functools.cache
+    def _compile_literals(cls) -> tuple:
+        """Map required literals to the threat types they can signal
+        
+        Returns (literal -> threat types, Aho-Corasick automaton or None).
+        """
+        literal_types = {}
+        for threat_type, literal_sets in cls.THREAT_LITERALS.items():
+            for literals in literal_sets:
+                for literal in literals:
+                    literal_types.setdefault(literal, set()).add(threat_type)
+        
+        automaton = None
+        if HAS_AHOCORASICK:
+            automaton = ahocorasick.Automaton()
+            for literal, threat_types in literal_types.items():
+                automaton.add_word(literal, frozenset(threat_types))
+            automaton.make_automaton()
+        return literal_types, automaton
+    
+    @classmethod
+    @functools.cache
+    def _compile_hyperscan(cls) -> tuple:
+        """Compile every threat pattern into one Hyperscan database
+        
+        Returns (database or None, id -> (threat type, index), prefilter-only ids).
+        """
+        if not HAS_HYPERSCAN:
+            return None, [], frozenset()
+        
+        # UTF8 + UCP keep \s and \w Unicode-aware like Python's re;
+        # SOM_LEFTMOST reports where each match starts, not just where it ends
+        base_flags = (hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_MULTILINE |
+                      hyperscan.HS_FLAG_DOTALL | hyperscan.HS_FLAG_UTF8 | hyperscan.HS_FLAG_UCP)
+        
+        expressions = []
+        flags = []
+        ids = []
+        prefilter_ids = set()
+        for threat_type, patterns in cls.THREAT_PATTERNS.items():
+            for index, pattern in enumerate(patterns):
+                pattern_flags = base_flags | hyperscan.HS_FLAG_SOM_LEFTMOST
+                
+                # Unicode \w and counted repeats make start tracking too large
+                # and slow to compile, so such patterns only flag their type
+                # for a regex scan; {0,m} relaxed to * and {n,m} to + still
+                # match a superset of the pattern
+                if r'\w' in pattern or _COUNTED_REPEAT.search(pattern):
+                    pattern = _COUNTED_REPEAT.sub(lambda m: '*' if m.group(1) == '0' else '+', pattern)
+                    pattern_flags = base_flags | hyperscan.HS_FLAG_SINGLEMATCH
+                    prefilter_ids.add(len(expressions))
+                
+                expressions.append(pattern.encode('utf-8'))
+                flags.append(pattern_flags)
+                ids.append((threat_type, index))
+        
+        try:
+            db = hyperscan.Database()
+            db.compile(
+                expressions=expressions,
+                ids=list(range(len(expressions))),
+                elements=len(expressions),
+                flags=flags
+            )
+        except Exception as e:
+            logger.warning(f"Hyperscan compile failed, using regex scanning: {e}")
+            return None, [], frozenset()
+        return db, ids, frozenset(prefilter_ids)
+    
+    def _hyperscan_matches(self, prompt: str) -> Optional[Dict[ThreatType, Optional[List[str]]]]:
+        """Return matched text per threat type from one Hyperscan pass, or None without Hyperscan
+        
+        A type maps to None when one of its prefilter-only patterns hit and it
+        needs a regex scan for the matched text.
+        """
+        if self._hs_db is None:
+            return None
+        
+        # Scratch space is per thread; scans run in the DB worker pool
+        scratch = getattr(self._hs_local, 'scratch', None)
+        if scratch is None:
+            scratch = self._hs_local.scratch = hyperscan.Scratch(self._hs_db)
+        
+        # Hyperscan reports every end offset a match could stop at; keep the
+        # furthest end per start and pattern, which is what a greedy regex
+        # would match
+        spans = {}
+        rescan = set()
+        
+        def on_match(pattern_id, start, end, flags, context):
+            if pattern_id in self._hs_prefilter_ids:
+                rescan.add(self._hs_ids[pattern_id][0])
+                return
+            ends = spans.setdefault(pattern_id, {})
+            if end > ends.get(start, -1):
+                ends[start] = end
+        
+        data = prompt.encode('utf-8', 'replace')
+        self._hs_db.scan(data, match_event_handler=on_match, scratch=scratch)
+        
+        # Drop overlapping spans of each pattern, leftmost first, as finditer
+        # would; every pattern's matches count, as with a scan per pattern
+        matches = dict.fromkeys(rescan)
+        for pattern_id in sorted(spans):
+            threat_type = self._hs_ids[pattern_id][0]
+            if threat_type in rescan:
+                continue
+            found = matches.setdefault(threat_type, [])
+            ends = spans[pattern_id]
+            last_end = 0
+            for start in sorted(ends):
+                if start >= last_end:
+                    last_end = ends[start]
+                    found.append(data[start:last_end].decode('utf-8', 'replace'))
+        return matches
+    
+    def _literal_candidates(self, prompt: str, lowered: Optional[str] = None) -> Set[ThreatType]:
+        """Return the threat types whose required literals occur in the prompt
+        
+        lowered is prompt.lower() for an ASCII prompt when the caller has it.
+        """
+        if lowered is not None:
+            folded = lowered
+        elif prompt.isascii():
+            folded = prompt.lower()
+        else:
+            folded = prompt.translate(_FOLD_DOTTED_I).casefold()
+        
+        if self._literal_automaton is not None:
+            candidates = set()
+            for _, threat_types in self._literal_automaton.iter(folded):
+                candidates |= threat_types
+            return candidates
+        
+        candidates = set()
+        for literal, threat_types in self._literal_types.items():
+            if literal in folded:
+                candidates |= threat_types
+        return candidates
     
     def scan_prompt(
         self, 
@@ -199,218 +686,388 @@ class PromptSecurityScanner:
         Scan prompt for security threats
         Returns (detected_threats, sanitized_prompt)
         """
+        return self.scan_prompts([prompt], user_id, api_key_id, ip_address)[0]
+    
+    def scan_prompts(
+        self,
+        prompts: List[str],
+        user_id: int = None,
+        api_key_id: int = None,
+        ip_address: str = None
+    ) -> List[Tuple[List[ThreatDetection], str]]:
+        """Scan a batch of prompts, such as the messages of one conversation
         
+        Returns (detected_threats, sanitized_prompt) per prompt, in order.
+        """
         if not self.policy.enabled:
-            return [], prompt
+            return [([], prompt) for prompt in prompts]
+        
+        results = []
+        for prompt in prompts:
+            detected_threats, sanitized_prompt, prompt_bytes = self._scan_one(prompt)
+            
+            # Log threats
+            if detected_threats:
+                self._log_threats(detected_threats, prompt, user_id, api_key_id, ip_address, prompt_bytes)
+            
+            results.append((list(detected_threats), prompt if sanitized_prompt is None else sanitized_prompt))
+        return results
+    
+    def _scan_one(self, prompt: str) -> Tuple[Tuple[ThreatDetection, ...], Optional[str], bytes]:
+        """Scan one prompt through the cache, without logging
         
+        Also returns the encoded prompt for the threat log hash; for a prompt
+        rejected for its length, only the part up to the limit is encoded.
+        """
         # Check prompt length
         if len(prompt) > self.policy.max_prompt_length:
             threat = ThreatDetection(
                 threat_type=ThreatType.PROMPT_INJECTION,
                 severity=Severity.MEDIUM,
                 confidence=1.0,
-                matched_patterns=["prompt_too_long"],
+                matched_patterns=("prompt_too_long",),
                 description=f"Prompt exceeds maximum length of {self.policy.max_prompt_length} characters",
                 suggested_action=Action.BLOCK
             )
-            self._log_threat(threat, prompt, user_id, api_key_id, ip_address)
-            return [threat], prompt
+            
+            # The request hash covers only the allowed length, so an oversize
+            # payload costs no more to log than a prompt at the limit
+            limit = self.policy.max_prompt_length + 1
+            return (threat,), None, prompt[:limit].encode('utf-8', 'surrogatepass')
+        
+        # Encoded once for both the cache key and the threat log hashes
+        prompt_bytes = prompt.encode('utf-8', 'surrogatepass')
+        
+        # Identical prompts give identical detections; only logging is redone
+        key = hashlib.blake2b(prompt_bytes, digest_size=16).digest()
+        cached = self._scan_cache_get(key)
+        if cached is None:
+            cached = self._scan_core(prompt)
+            self._scan_cache_put(key, cached)
+        detected_threats, sanitized_prompt = cached
+        return detected_threats, sanitized_prompt, prompt_bytes
+    
+    def _scan_core(self, prompt: str) -> Tuple[Tuple[ThreatDetection, ...], Optional[str]]:
+        """Match the prompt against the threat patterns without side effects
         
+        The sanitized prompt is None when sanitization left it unchanged, so
+        cached results do not hold on to the prompt itself.
+        """
         detected_threats = []
-        sanitized_prompt = prompt
-        
-        # Pattern-based detection
-        for threat_type, patterns in self.compiled_patterns.items():
-            matches = []
-            for pattern in patterns:
-                found_matches = pattern.findall(prompt)
-                if found_matches:
-                    matches.extend([str(match) for match in found_matches])
+        sanitized_prompt = None
+        
+        # ASCII prompts are lowercased once and matched without IGNORECASE,
+        # which re does faster; lower() keeps ASCII offsets, so matched text
+        # is still sliced from the original prompt
+        lowered = prompt.isascii()
+        if lowered:
+            subject = prompt.lower()
+            patterns = self.lowered_patterns
+        else:
+            subject = prompt
+            patterns = self.fused_patterns
+        
+        found = self._hyperscan_matches(prompt)
+        if found is None:
+            candidates = self._literal_candidates(prompt, subject if lowered else None)
+            
+            # Literals like "what" or "user" are common in benign prompts; one
+            # pass of the candidates' combined pattern rules them all out at
+            # once instead of a pass per type
+            if len(candidates) > 1:
+                master = self._compile_master_pattern(frozenset(candidates), lowered)
+                if master.search(subject) is None:
+                    return (), None
+        else:
+            candidates = found
+        if not candidates:
+            return (), None
+        
+        source_patterns = self.lowered_source_patterns if lowered else self.source_patterns
+        
+        # Pattern-based detection, one pass per threat type without Hyperscan
+        for threat_type, pattern in patterns.items():
+            if threat_type not in candidates:
+                continue
             
-            if len(matches) >= self.policy.suspicious_pattern_threshold:
-                confidence = min(1.0, len(matches) / 5.0)  # Scale confidence
-                severity = self._calculate_severity(threat_type, len(matches))
+            matches = found[threat_type] if found is not None else None
+            if matches is not None:
+                count = len(matches)
+            elif pattern.search(subject) is None:
+                # Without a fused match the type cannot match at all, so
+                # prompts without one stop here whatever the threshold
+                continue
+            else:
+                # The fused pattern only tells whether the type may match;
+                # hits of different patterns may overlap and each counts
+                # toward the threshold, so matches are counted per source
+                # pattern
+                matches, count = self._count_matches(source_patterns[threat_type], subject, prompt)
+            
+            if count >= self.policy.suspicious_pattern_threshold:
+                confidence = min(1.0, count / 5.0)  # Scale confidence
+                severity = self._calculate_severity(threat_type, count)
                 
                 threat = ThreatDetection(
                     threat_type=threat_type,
                     severity=severity,
                     confidence=confidence,
-                    matched_patterns=matches[:5],  # Limit to first 5 matches
-                    description=f"Detected {threat_type.value} patterns: {len(matches)} matches",
-                    suggested_action=self.policy.actions.get(threat_type, Action.LOG)
+                    matched_patterns=tuple(matches[:self.MAX_REPORTED_MATCHES]),
+                    description=f"Detected {threat_type.value} patterns: {count} matches",
+                    suggested_action=self._policy_table[threat_type][0]
                 )
                 
                 detected_threats.append(threat)
                 
                 # Apply sanitization if needed
                 if threat.suggested_action == Action.SANITIZE:
-                    sanitized_prompt = self._sanitize_prompt(sanitized_prompt, threat_type, patterns)
+                    sanitized_prompt = self._sanitize_prompt(
+                        prompt if sanitized_prompt is None else sanitized_prompt, threat_type
+                    )
         
-        # Log threats
-        for threat in detected_threats:
-            self._log_threat(threat, prompt, user_id, api_key_id, ip_address)
+        return tuple(detected_threats), sanitized_prompt
+    
+    def _count_matches(self, patterns, subject: str, prompt: str) -> Tuple[List[str], int]:
+        """Count the matches of each pattern in subject, in pattern order
         
-        return detected_threats, sanitized_prompt
+        Only the first few matches are kept, sliced from prompt, and counting
+        stops at a cap for prompts that match thousands of times.
+        """
+        matches = []
+        count = 0
+        for pattern in patterns:
+            for match in pattern.finditer(subject):
+                if count < self.MAX_REPORTED_MATCHES:
+                    matches.append(prompt[match.start():match.end()])
+                count += 1
+                if count >= self.MAX_COUNTED_MATCHES:
+                    return matches, count
+        return matches, count
+    
+    def _scan_cache_get(self, key: bytes) -> Optional[tuple]:
+        """Cached scan result for key, or None, marking it recently used"""
+        with self._scan_cache_lock:
+            cached = self._scan_cache.pop(key, None)
+            if cached is None:
+                return None
+            self._scan_cache[key] = cached
+            return cached[0]
+    
+    def _scan_cache_put(self, key: bytes, result: tuple):
+        """Cache a scan result, evicting the least recently used past either bound"""
+        if self.scan_cache_size <= 0:
+            return
+        
+        # Four bytes per character at most, as CPython stores strings
+        detections, sanitized = result
+        size = 4 * (len(sanitized or '') + sum(
+            len(matched) for detection in detections for matched in detection.matched_patterns
+        ))
+        if size > self.scan_cache_bytes:
+            return
+        
+        with self._scan_cache_lock:
+            # Another thread may have cached the same prompt meanwhile
+            replaced = self._scan_cache.pop(key, None)
+            if replaced is not None:
+                self._scan_cache_used -= replaced[1]
+            
+            while self._scan_cache and (
+                len(self._scan_cache) >= self.scan_cache_size
+                or self._scan_cache_used + size > self.scan_cache_bytes
+            ):
+                self._scan_cache_used -= self._scan_cache.pop(next(iter(self._scan_cache)))[1]
+            
+            self._scan_cache[key] = (result, size)
+            self._scan_cache_used += size
     
     def _calculate_severity(self, threat_type: ThreatType, match_count: int) -> Severity:
         """Calculate threat severity based on type and match count"""
-        base_severity = {
-            ThreatType.PROMPT_INJECTION: Severity.HIGH,
-            ThreatType.JAILBREAK: Severity.MEDIUM,
-            ThreatType.DATA_EXTRACTION: Severity.HIGH,
-            ThreatType.SYSTEM_PROMPT_LEAK: Severity.CRITICAL,
-            ThreatType.CREDENTIAL_HARVESTING: Severity.CRITICAL,
-        }.get(threat_type, Severity.LOW)
+        base_severity = self._policy_table[threat_type][1]
         
         # Escalate severity based on match count
         if match_count >= 5:
-            if base_severity == Severity.LOW:
-                return Severity.MEDIUM
-            elif base_severity == Severity.MEDIUM:
-                return Severity.HIGH
-            elif base_severity == Severity.HIGH:
-                return Severity.CRITICAL
+            return _ESCALATED_SEVERITY[base_severity]
         
         return base_severity
     
-    def _sanitize_prompt(self, prompt: str, threat_type: ThreatType, patterns: List[re.Pattern]) -> str:
-        """Sanitize prompt by removing or modifying threatening content"""
+    def _sanitize_prompt(self, prompt: str, threat_type: ThreatType) -> str:
+        """Sanitize prompt by redacting the matches of each pattern of the threat type"""
         sanitized = prompt
-        
-        for pattern in patterns:
-            # Replace matches with sanitized versions
-            if threat_type == ThreatType.PROMPT_INJECTION:
-                sanitized = pattern.sub("[REDACTED: Instruction override attempt]", sanitized)
-            elif threat_type == ThreatType.JAILBREAK:
-                sanitized = pattern.sub("[REDACTED: Roleplay attempt]", sanitized)
-            elif threat_type == ThreatType.DATA_EXTRACTION:
-                sanitized = pattern.sub("[REDACTED: System information request]", sanitized)
-            elif threat_type == ThreatType.SYSTEM_PROMPT_LEAK:
-                sanitized = pattern.sub("[REDACTED: System token]", sanitized)
-            elif threat_type == ThreatType.CREDENTIAL_HARVESTING:
-                sanitized = pattern.sub("[REDACTED: Credential]", sanitized)
-        
+        for pattern in self.source_patterns[threat_type]:
+            sanitized = pattern.sub(self._REDACTION[threat_type], sanitized)
         return sanitized
     
-    def _log_threat(
-        self, 
-        threat: ThreatDetection, 
+    def _log_threats(
+        self,
+        threats: List[ThreatDetection],
         original_prompt: str,
         user_id: int = None,
         api_key_id: int = None,
-        ip_address: str = None
+        ip_address: str = None,
+        prompt_bytes: Optional[bytes] = None
     ):
-        """Log security threat to database"""
+        """Log the threats found in one prompt to the database, a row per threat
+        
+        The rows share the prompt sample and request hash and are written
+        together. prompt_bytes is what scan_prompts already encoded for the
+        request hash: the prompt, or only its allowed length for an
+        oversize prompt.
+        """
         try:
-            # Get organization ID if we have user or API key
-            org_id = None
-            if api_key_id:
-                api_key = self.db(self.db.api_keys.id == api_key_id).select().first()
-                if api_key:
-                    org_id = api_key.organization_id
-                    if not user_id:
-                        user_id = api_key.user_id
-            
-            if user_id and not org_id:
-                user = self.db(self.db.users.id == user_id).select().first()
-                if user:
-                    org_id = user.organization_id
-            
             # Create prompt sample (truncated for storage)
             prompt_sample = original_prompt[:1000] if original_prompt else ""
             
-            # Generate request hash
-            request_hash = hashlib.md5(
-                (original_prompt + str(datetime.utcnow().timestamp())).encode()
+            # Generate request hash; the log time goes in as the BLAKE2b salt
+            # instead of being appended to a copy of the prompt
+            now = datetime.utcnow()
+            if prompt_bytes is None:
+                prompt_bytes = original_prompt.encode('utf-8', 'surrogatepass')
+            request_hash = hashlib.blake2b(
+                prompt_bytes,
+                digest_size=16,
+                salt=struct.pack('<d', now.timestamp())
             ).hexdigest()
             
-            # Log to database
-            self.db.security_logs.insert(
-                timestamp=datetime.utcnow(),
-                api_key_id=api_key_id,
-                user_id=user_id,
-                organization_id=org_id,
-                request_hash=request_hash,
-                threat_type=threat.threat_type.value,
-                severity=threat.severity.value,
-                blocked=(threat.suggested_action == Action.BLOCK),
-                prompt_sample=prompt_sample,
-                detection_rules=json.dumps({
-                    'patterns': threat.matched_patterns,
-                    'confidence': threat.confidence,
-                    'policy': self.policy.name
-                }),
-                ip_address=ip_address
-            )
+            rows = [
+                {
+                    'timestamp': now,
+                    'api_key_id': api_key_id,
+                    'user_id': user_id,
+                    'request_hash': request_hash,
+                    'threat_type': threat.threat_type.value,
+                    'severity': threat.severity.value,
+                    'blocked': (threat.suggested_action == Action.BLOCK),
+                    'prompt_sample': prompt_sample,
+                    'detection_rules': json.dumps({
+                        'patterns': threat.matched_patterns,
+                        'confidence': threat.confidence,
+                        'policy': self.policy.name
+                    }),
+                    'ip_address': ip_address
+                }
+                for threat in threats
+            ]
+            
+            # Log to database, or leave it to the batching writer when running
+            if self.log_writer is not None:
+                dropped = [row for row in rows if not self.log_writer.submit(row)]
+                if dropped:
+                    logger.warning(f"Security log queue is full, dropping {len(dropped)} threat logs")
+            else:
+                self._write_threat_logs(rows)
             
             # Log to application logger
-            logger.warning(
-                f"Security threat detected: {threat.threat_type.value} "
-                f"(severity: {threat.severity.value}, confidence: {threat.confidence:.2f}) "
-                f"User: {user_id}, API Key: {api_key_id}, IP: {ip_address}"
-            )
+            for threat in threats:
+                logger.warning(
+                    f"Security threat detected: {threat.threat_type.value} "
+                    f"(severity: {threat.severity.value}, confidence: {threat.confidence:.2f}) "
+                    f"User: {user_id}, API Key: {api_key_id}, IP: {ip_address}"
+                )
             
         except Exception as e:
-            logger.error(f"Failed to log security threat: {e}")
+            logger.error(f"Failed to log security threats: {e}")
+    
+    def _write_threat_logs(self, rows: List[Dict]):
+        """Fill in each row's organization and insert the rows together"""
+        for row in rows:
+            row['organization_id'], row['user_id'] = self._resolve_org(row['user_id'], row['api_key_id'])
+        self.db.security_logs.bulk_insert(rows)
+    
+    def _resolve_org(self, user_id: Optional[int], api_key_id: Optional[int]) -> Tuple[Optional[int], Optional[int]]:
+        """Return (organization_id, user_id) for a threat's user or API key, cached for org_cache_ttl"""
+        key = (user_id, api_key_id)
+        now = time.monotonic()
+        with self._org_cache_lock:
+            cached = self._org_cache.get(key)
+        if cached and cached[0] > now:
+            return cached[1]
+        
+        resolved = self._lookup_org(user_id, api_key_id)
+        
+        with self._org_cache_lock:
+            if len(self._org_cache) >= self.org_cache_size:
+                # Drop expired entries first, then the oldest if still full
+                for stale in [k for k, (expires, _) in self._org_cache.items() if expires <= now]:
+                    del self._org_cache[stale]
+                if len(self._org_cache) >= self.org_cache_size:
+                    self._org_cache.pop(next(iter(self._org_cache)), None)
+            self._org_cache[key] = (now + self.org_cache_ttl, resolved)
+        return resolved
+    
+    def _lookup_org(self, user_id: Optional[int], api_key_id: Optional[int]) -> Tuple[Optional[int], Optional[int]]:
+        """Look up (organization_id, user_id) in the database"""
+        org_id = None
+        if api_key_id:
+            api_key = self.db(self.db.api_keys.id == api_key_id).select().first()
+            if api_key:
+                org_id = api_key.organization_id
+                if not user_id:
+                    user_id = api_key.user_id
+        
+        if user_id and not org_id:
+            user = self.db(self.db.users.id == user_id).select().first()
+            if user:
+                org_id = user.organization_id
+        
+        return org_id, user_id
+    
+    def start_log_writer(self, max_queue: int = 10000, max_batch: int = 500, max_delay: float = 0.1):
+        """Write security logs from a background thread in batches"""
+        if self.log_writer is None:
+            self.log_writer = ThreatLogWriter(self.db, self._write_threat_logs, max_queue, max_batch, max_delay)
+            self.log_writer.start()
+    
+    def stop_log_writer(self):
+        """Flush queued security logs and stop the background writer"""
+        writer, self.log_writer = self.log_writer, None
+        if writer is not None:
+            writer.close()
     
     def check_rate_limit(self, user_id: int = None, api_key_id: int = None, ip_address: str = None) -> bool:
         """Check if user/IP has exceeded threat rate limit"""
         if not self.policy.enabled:
             return True
         
-        # Check threats in the last hour
-        one_hour_ago = datetime.utcnow() - timedelta(hours=1)
-        
-        conditions = [self.db.security_logs.timestamp > one_hour_ago]
+        # Check threats in the last hour, counted in one query
+        logs = self.db.security_logs
+        query = logs.timestamp > datetime.utcnow() - timedelta(hours=1)
         
         if api_key_id:
-            conditions.append(self.db.security_logs.api_key_id == api_key_id)
+            query &= (logs.api_key_id == api_key_id)
         elif user_id:
-            conditions.append(self.db.security_logs.user_id == user_id)
+            query &= (logs.user_id == user_id)
         elif ip_address:
-            conditions.append(self.db.security_logs.ip_address == ip_address)
+            query &= (logs.ip_address == ip_address)
         else:
             return True  # No identifier to check
         
-        threat_count = self.db(conditions[0]).count()
-        for condition in conditions[1:]:
-            threat_count = self.db(threat_count & condition).count()
-        
-        return threat_count < self.policy.rate_limit_threshold
+        return self.db(query).count() < self.policy.rate_limit_threshold
     
     def get_security_stats(self, hours: int = 24) -> Dict:
         """Get security statistics for the specified time period"""
-        since = datetime.utcnow() - timedelta(hours=hours)
+        logs = self.db.security_logs
+        query = logs.timestamp > datetime.utcnow() - timedelta(hours=hours)
         
-        logs = self.db(self.db.security_logs.timestamp > since).select()
+        # Aggregate in the database rather than loading every log
+        log_count = logs.id.count()
         
-        stats = {
-            'total_threats': len(logs),
-            'blocked_requests': len([log for log in logs if log.blocked]),
-            'threat_types': {},
-            'severity_breakdown': {},
-            'top_ips': {},
-            'top_users': {}
-        }
+        def count_by(field, present=None):
+            rows = self.db(query if present is None else query & present).select(
+                field, log_count, groupby=field
+            )
+            return {row[field]: row[log_count] for row in rows}
         
-        for log in logs:
-            # Count by threat type
-            threat_type = log.threat_type
-            stats['threat_types'][threat_type] = stats['threat_types'].get(threat_type, 0) + 1
-            
-            # Count by severity
-            severity = log.severity
-            stats['severity_breakdown'][severity] = stats['severity_breakdown'].get(severity, 0) + 1
-            
-            # Count by IP
-            if log.ip_address:
-                stats['top_ips'][log.ip_address] = stats['top_ips'].get(log.ip_address, 0) + 1
-            
-            # Count by user
-            if log.user_id:
-                stats['top_users'][log.user_id] = stats['top_users'].get(log.user_id, 0) + 1
+        threat_types = count_by(logs.threat_type)
         
-        return stats
+        return {
+            'total_threats': sum(threat_types.values()),
+            'blocked_requests': self.db(query & (logs.blocked == True)).count(),
+            'threat_types': threat_types,
+            'severity_breakdown': count_by(logs.severity),
+            'top_ips': count_by(logs.ip_address, (logs.ip_address != None) & (logs.ip_address != '')),
+            'top_users': count_by(logs.user_id, logs.user_id != None)
+        }
 
 
 def create_security_scanner(db, policy: str = "balanced") -> PromptSecurityScanner:
@@ -297,6 +297,12 @@ class WaddleAIHealthMonitor:
         self.service_name = service_name
         self.checkers: List[HealthChecker] = []
         self.last_results: Dict[str, HealthCheckResult] = {}
+        
+        # Most recent check_all() summary and when it was taken, shared by
+        # concurrent callers of check_all_cached()
+        self._cached_summary: Optional[Dict[str, Any]] = None
+        self._cached_at = 0.0
+        self._check_lock = asyncio.Lock()
     
     def add_checker(self, checker: HealthChecker):
         """Add a health checker"""
@@ -383,6 +389,24 @@ class WaddleAIHealthMonitor:
         
         return summary
     
+    async def check_all_cached(self, max_age: float = 2.0) -> Dict[str, Any]:
+        """Run all health checks at most once per max_age seconds
+        
+        Concurrent callers wait on a single in-flight check instead of each
+        probing the database, Redis and LLM providers themselves.
+        """
+        if self._cached_summary is not None and time.monotonic() - self._cached_at < max_age:
+            return self._cached_summary
+        
+        async with self._check_lock:
+            # Another caller may have refreshed the summary while we waited
+            if self._cached_summary is not None and time.monotonic() - self._cached_at < max_age:
+                return self._cached_summary
+            
+            self._cached_summary = await self.check_all()
+            self._cached_at = time.monotonic()
+            return self._cached_summary
+    
     async def check_single(self, checker_name: str) -> Optional[Dict[str, Any]]:
         """Run a single health check by name"""
         checker = next((c for c in self.checkers if c.name == checker_name), None)
@@ -7,7 +7,7 @@ import asyncio
 import aiohttp
 import json
 import logging
-from typing import Dict, List, Optional, Any, Tuple
+from typing import AsyncIterator, Dict, List, Optional, Any, Tuple
 from abc import ABC, abstractmethod
 from datetime import datetime
 import openai
@@ -38,6 +38,21 @@ class LLMConnector(ABC):
         """Generate chat completion"""
         pass
     
+    async def stream_chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        usage_info: Dict[str, Any],
+        **kwargs
+    ) -> AsyncIterator[str]:
+        """Yield completion text as it arrives, filling usage_info at the end
+        
+        Providers without native streaming yield the whole completion at once.
+        """
+        content, info = await self.chat_completion(messages, model, **kwargs)
+        usage_info.update(info)
+        yield content
+    
     @abstractmethod
     async def count_tokens(self, text: str, model: str) -> int:
         """Count tokens in text"""
@@ -101,6 +116,43 @@ class OpenAIConnector(LLMConnector):
             logger.error(f"OpenAI completion failed: {e}")
             raise
     
+    async def stream_chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        usage_info: Dict[str, Any],
+        **kwargs
+    ) -> AsyncIterator[str]:
+        """Stream an OpenAI chat completion"""
+        stream = await self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            stream=True,
+            stream_options={'include_usage': True},
+            **kwargs
+        )
+        
+        finish_reason = None
+        async for chunk in stream:
+            if chunk.usage:
+                usage_info.update({
+                    'input_tokens': chunk.usage.prompt_tokens,
+                    'output_tokens': chunk.usage.completion_tokens,
+                    'total_tokens': chunk.usage.total_tokens,
+                })
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            finish_reason = choice.finish_reason or finish_reason
+            if choice.delta.content:
+                yield choice.delta.content
+        
+        usage_info.update({
+            'model': model,
+            'finish_reason': finish_reason or 'stop',
+            'provider': 'openai'
+        })
+    
     async def count_tokens(self, text: str, model: str) -> int:
         """Count tokens using OpenAI tokenizer"""
         try:
@@ -223,6 +275,49 @@ class AnthropicConnector(LLMConnector):
             logger.error(f"Anthropic completion failed: {e}")
             raise
     
+    async def stream_chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        usage_info: Dict[str, Any],
+        **kwargs
+    ) -> AsyncIterator[str]:
+        """Stream an Anthropic chat completion"""
+        system_message = ""
+        user_messages = []
+        
+        for msg in messages:
+            if msg['role'] == 'system':
+                system_message = msg['content']
+            else:
+                user_messages.append(msg)
+        
+        parts = []
+        async with self.client.messages.stream(
+            model=model,
+            max_tokens=kwargs.get('max_tokens', 1000),
+            system=system_message if system_message else None,
+            messages=user_messages
+        ) as stream:
+            async for text in stream.text_stream:
+                parts.append(text)
+                yield text
+            final = await stream.get_final_message()
+        
+        # Estimate token usage the same way as the buffered call
+        input_text = system_message + " ".join([msg['content'] for msg in user_messages])
+        input_tokens = len(self.token_estimator.encode(input_text))
+        output_tokens = len(self.token_estimator.encode("".join(parts)))
+        
+        usage_info.update({
+            'input_tokens': input_tokens,
+            'output_tokens': output_tokens,
+            'total_tokens': input_tokens + output_tokens,
+            'model': model,
+            'finish_reason': final.stop_reason,
+            'provider': 'anthropic'
+        })
+    
     async def count_tokens(self, text: str, model: str) -> int:
         """Estimate tokens for Anthropic models"""
         try:
@@ -282,9 +377,12 @@ class AnthropicConnector(LLMConnector):
 class OllamaConnector(LLMConnector):
     """Ollama local LLM connector"""
     
-    def __init__(self, name: str, config: Dict[str, Any]):
+    def __init__(self, name: str, config: Dict[str, Any],
+                 session: Optional[aiohttp.ClientSession] = None):
         super().__init__(name, config)
-        self.session = aiohttp.ClientSession()
+        # A shared session is owned (and closed) by whoever created it
+        self._owns_session = session is None
+        self.session = session or aiohttp.ClientSession()
         
         # Use OpenAI tokenizer for estimation
         self.token_estimator = tiktoken.encoding_for_model("gpt-3.5-turbo")
@@ -338,6 +436,61 @@ class OllamaConnector(LLMConnector):
             logger.error(f"Ollama completion failed: {e}")
             raise
     
+    async def stream_chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        usage_info: Dict[str, Any],
+        **kwargs
+    ) -> AsyncIterator[str]:
+        """Stream an Ollama chat completion"""
+        payload = {
+            'model': model,
+            'messages': messages,
+            'stream': True,
+            'options': {
+                'temperature': kwargs.get('temperature', 0.7),
+                'num_predict': kwargs.get('max_tokens', -1)
+            }
+        }
+        
+        parts = []
+        finish_reason = 'stop'
+        async with self.session.post(
+            f"{self.endpoint_url}/api/chat",
+            json=payload,
+            timeout=aiohttp.ClientTimeout(total=300)
+        ) as response:
+            if response.status != 200:
+                raise Exception(f"Ollama API error: {response.status}")
+            
+            # Ollama streams one JSON object per line
+            async for line in response.content:
+                if not line.strip():
+                    continue
+                data = json.loads(line)
+                text = data.get('message', {}).get('content')
+                if text:
+                    parts.append(text)
+                    yield text
+                if data.get('done'):
+                    finish_reason = data.get('done_reason', 'stop')
+                    break
+        
+        # Estimate token usage
+        input_text = " ".join([msg['content'] for msg in messages])
+        input_tokens = len(self.token_estimator.encode(input_text))
+        output_tokens = len(self.token_estimator.encode("".join(parts)))
+        
+        usage_info.update({
+            'input_tokens': input_tokens,
+            'output_tokens': output_tokens,
+            'total_tokens': input_tokens + output_tokens,
+            'model': model,
+            'finish_reason': finish_reason,
+            'provider': 'ollama'
+        })
+    
     async def count_tokens(self, text: str, model: str) -> int:
         """Estimate tokens for Ollama models"""
         try:
@@ -436,16 +589,20 @@ class OllamaConnector(LLMConnector):
     
     async def close(self):
         """Close the HTTP session"""
-        if self.session:
+        if self.session and self._owns_session:
             await self.session.close()
 
 
 class LLMConnectionManager:
     """Manages all LLM provider connections"""
     
-    def __init__(self, db):
+    def __init__(self, db, http_session: Optional[aiohttp.ClientSession] = None):
         self.db = db
+        # Pooled session shared by HTTP-based connectors, if provided
+        self.http_session = http_session
         self.connectors: Dict[str, LLMConnector] = {}
+        # Ollama connectors, which also support model management
+        self.ollama_connectors: List[OllamaConnector] = []
         self._load_connectors()
     
     def _load_connectors(self):
@@ -468,12 +625,14 @@ class LLMConnectionManager:
                 elif link.provider == 'anthropic':
                     connector = AnthropicConnector(link.name, config)
                 elif link.provider == 'ollama':
-                    connector = OllamaConnector(link.name, config)
+                    connector = OllamaConnector(link.name, config, session=self.http_session)
                 else:
                     logger.warning(f"Unknown provider: {link.provider}")
                     continue
                 
                 self.connectors[link.name] = connector
+                if isinstance(connector, OllamaConnector):
+                    self.ollama_connectors.append(connector)
                 logger.info(f"Loaded connector: {link.name} ({link.provider})")
                 
             except Exception as e:
@@ -482,12 +641,17 @@ class LLMConnectionManager:
     def reload_connectors(self):
         """Reload connectors from database"""
         self.connectors.clear()
+        self.ollama_connectors.clear()
         self._load_connectors()
     
     def get_connector(self, name: str) -> Optional[LLMConnector]:
         """Get connector by name"""
         return self.connectors.get(name)
     
+    def get_ollama(self) -> Optional[OllamaConnector]:
+        """Get the first Ollama connector, if any is configured"""
+        return self.ollama_connectors[0] if self.ollama_connectors else None
+    
     def get_connector_for_model(self, model: str) -> Optional[LLMConnector]:
         """Get connector that supports the specified model"""
         for connector in self.connectors.values():
@@ -538,6 +702,6 @@ class LLMConnectionManager:
                 await connector.close()
 
 
-def create_llm_connection_manager(db) -> LLMConnectionManager:
+def create_llm_connection_manager(db, http_session=None) -> LLMConnectionManager:
     """Factory function to create LLM connection manager"""
-    return LLMConnectionManager(db)
\ No newline at end of file
+    return LLMConnectionManager(db, http_session=http_session)
\ No newline at end of file
@@ -210,9 +210,54 @@ class MCPServer:
             return None
     
     async def _handle_message(self, websocket: WebSocketServerProtocol, message: str, user_context: UserContext):
-        """Handle incoming MCP message"""
+        """Handle incoming MCP message or JSON-RPC batch"""
+        data = None
         try:
             data = json.loads(message)
+            
+            if isinstance(data, list):
+                # JSON-RPC 2.0 batch: answer every request in a single frame
+                if not data:
+                    await websocket.send(json.dumps({
+                        "jsonrpc": "2.0",
+                        "id": None,
+                        "error": {"code": -32600, "message": "Invalid Request"}
+                    }))
+                    return
+                
+                responses = await asyncio.gather(
+                    *(self._process_message(item, user_context) for item in data)
+                )
+                
+                # Notifications (requests without an id) are run but never
+                # answered; a batch of only notifications gets no frame at all
+                responses = [
+                    response for item, response in zip(data, responses)
+                    if not (isinstance(item, dict) and "method" in item and "id" not in item)
+                ]
+                if responses:
+                    await websocket.send(json.dumps(responses))
+            else:
+                response_data = await self._process_message(data, user_context)
+                await websocket.send(json.dumps(response_data))
+            
+        except json.JSONDecodeError:
+            await websocket.send(json.dumps({
+                "jsonrpc": "2.0",
+                "id": None,
+                "error": {"code": -32700, "message": "Parse error"}
+            }))
+        except Exception as e:
+            logger.error(f"Message handling error: {e}")
+            await websocket.send(json.dumps({
+                "jsonrpc": "2.0",
+                "id": data.get("id") if isinstance(data, dict) else None,
+                "error": {"code": -32603, "message": "Internal error"}
+            }))
+    
+    async def _process_message(self, data: Dict[str, Any], user_context: UserContext) -> Dict[str, Any]:
+        """Process a single decoded MCP message and build its response"""
+        try:
             mcp_message = MCPMessage(**data)
             
             if mcp_message.method:
@@ -224,25 +269,17 @@ class MCPServer:
                     error={"code": -32601, "message": "Method not found"}
                 )
             
-            # Send response
             response_data = asdict(response)
             # Remove None values
-            response_data = {k: v for k, v in response_data.items() if v is not None}
-            await websocket.send(json.dumps(response_data))
+            return {k: v for k, v in response_data.items() if v is not None}
             
-        except json.JSONDecodeError:
-            await websocket.send(json.dumps({
-                "jsonrpc": "2.0",
-                "id": None,
-                "error": {"code": -32700, "message": "Parse error"}
-            }))
         except Exception as e:
             logger.error(f"Message handling error: {e}")
-            await websocket.send(json.dumps({
+            return {
                 "jsonrpc": "2.0",
-                "id": data.get("id") if 'data' in locals() else None,
+                "id": data.get("id") if isinstance(data, dict) else None,
                 "error": {"code": -32603, "message": "Internal error"}
-            }))
+            }
     
     async def _handle_method(self, message: MCPMessage, user_context: UserContext) -> MCPMessage:
         """Handle MCP method calls"""
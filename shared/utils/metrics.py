@@ -17,6 +17,16 @@ class WaddleAIMetrics:
     def __init__(self, service_name: str):
         self.service_name = service_name
         
+        # Last rendered exposition and when it was collected
+        self._rendered: Optional[bytes] = None
+        self._rendered_at = 0.0
+        
+        # Bound label children per (endpoint, method, status), so hot
+        # endpoints skip the labels() lookup on every request
+        self._request_children: Dict[tuple, tuple] = {}
+        self._llm_children: Dict[tuple, tuple] = {}
+        self._security_children: Dict[tuple, Any] = {}
+        
         # Request metrics
         self.requests_total = Counter(
             'waddleai_requests_total',
@@ -97,6 +107,13 @@ class WaddleAIMetrics:
             ['organization', 'user']
         )
         
+        # Request coalescing metrics
+        self.singleflight_coalesced_total = Counter(
+            'waddleai_singleflight_coalesced_total',
+            'Calls that joined an identical in-flight lookup',
+            ['service']
+        )
+        
         # Rate limiting metrics
         self.rate_limit_exceeded = Counter(
             'waddleai_rate_limit_exceeded_total',
@@ -114,18 +131,26 @@ class WaddleAIMetrics:
     
     def record_request(self, endpoint: str, method: str, status_code: int, duration: float):
         """Record HTTP request metrics"""
-        self.requests_total.labels(
-            service=self.service_name,
-            endpoint=endpoint,
-            method=method,
-            status_code=status_code
-        ).inc()
+        key = (endpoint, method, status_code)
+        children = self._request_children.get(key)
+        if children is None:
+            children = (
+                self.requests_total.labels(
+                    service=self.service_name,
+                    endpoint=endpoint,
+                    method=method,
+                    status_code=status_code
+                ),
+                self.request_duration.labels(
+                    service=self.service_name,
+                    endpoint=endpoint,
+                    method=method
+                )
+            )
+            self._request_children[key] = children
         
-        self.request_duration.labels(
-            service=self.service_name,
-            endpoint=endpoint,
-            method=method
-        ).observe(duration)
+        children[0].inc()
+        children[1].observe(duration)
     
     def record_llm_request(self, provider: str, model: str, status: str, token_usage: Dict[str, int]):
         """Record LLM request metrics"""
@@ -157,6 +182,55 @@ class WaddleAIMetrics:
                 provider=provider
             ).inc(token_usage['waddleai_tokens'])
     
+    def record_chat_completion(
+        self,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        token_usage: Optional[Dict[str, int]] = None,
+        security_events=()
+    ):
+        """Record everything a chat completion produced in one call
+        
+        security_events holds (event_type, severity, action) tuples; provider
+        is None when the request ended before reaching an LLM.
+        """
+        for event in security_events:
+            child = self._security_children.get(event)
+            if child is None:
+                event_type, severity, action = event
+                child = self.security_events_total.labels(
+                    event_type=event_type,
+                    severity=severity,
+                    action=action
+                )
+                self._security_children[event] = child
+            child.inc()
+        
+        if provider is None:
+            return
+        
+        key = (provider, model)
+        children = self._llm_children.get(key)
+        if children is None:
+            children = (
+                self.llm_requests_total.labels(provider=provider, model=model, status='success'),
+                self.llm_tokens_total.labels(provider=provider, model=model, token_type='input'),
+                self.llm_tokens_total.labels(provider=provider, model=model, token_type='output')
+            )
+            self._llm_children[key] = children
+        
+        token_usage = token_usage or {}
+        children[0].inc()
+        children[1].inc(token_usage.get('input_tokens', 0))
+        children[2].inc(token_usage.get('output_tokens', 0))
+        
+        if 'waddleai_tokens' in token_usage:
+            self.waddleai_tokens_total.labels(
+                organization=token_usage.get('organization', 'unknown'),
+                user=token_usage.get('user', 'unknown'),
+                provider=provider
+            ).inc(token_usage['waddleai_tokens'])
+    
     def record_security_event(self, event_type: str, severity: str, action: str):
         """Record security event"""
         self.security_events_total.labels(
@@ -217,9 +291,27 @@ class WaddleAIMetrics:
             limit_type=limit_type
         ).inc()
     
+    def record_singleflight_coalesced(self):
+        """Record a call served by an identical in-flight lookup"""
+        self.singleflight_coalesced_total.labels(service=self.service_name).inc()
+    
     def get_metrics(self) -> str:
         """Get Prometheus metrics in text format"""
         return generate_latest().decode('utf-8')
+    
+    def get_metrics_cached(self, max_age: float = 5.0) -> bytes:
+        """Get rendered metrics, collecting the registry at most once per max_age seconds"""
+        now = time.monotonic()
+        if self._rendered is None or now - self._rendered_at >= max_age:
+            self._rendered = generate_latest()
+            self._rendered_at = now
+        return self._rendered
+    
+    @staticmethod
+    def iter_metrics(data: bytes, chunk_size: int = 65536):
+        """Yield rendered metrics in chunks for a streaming response"""
+        for start in range(0, len(data), chunk_size):
+            yield data[start:start + chunk_size]
 
 
 class MetricsMiddleware:
@@ -229,8 +321,8 @@ class MetricsMiddleware:
         self.metrics = metrics
     
     def __call__(self, request, response, start_time: float):
-        """Record request metrics"""
-        duration = time.time() - start_time
+        """Record request metrics; start_time is a time.perf_counter() reading"""
+        duration = time.perf_counter() - start_time
         endpoint = getattr(request, 'url', {}).path if hasattr(request, 'url') else 'unknown'
         method = getattr(request, 'method', 'unknown')
         status_code = getattr(response, 'status_code', 0)
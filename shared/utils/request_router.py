@@ -6,7 +6,7 @@ Routes requests to optimal LLM providers based on model, cost, availability, and
 import logging
 import asyncio
 import random
-from typing import Dict, Any, List, Optional, Tuple
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple
 from dataclasses import dataclass
 from enum import Enum
 from datetime import datetime, timedelta
@@ -162,6 +162,74 @@ class LLMRequestRouter:
             **kwargs
         )
     
+    async def route_stream(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        usage_info: Dict[str, Any],
+        strategy: Optional[RoutingStrategy] = None,
+        user_preferences: Optional[Dict[str, Any]] = None,
+        **kwargs
+    ) -> AsyncIterator[str]:
+        """
+        Route a streaming request, yielding completion text as it arrives
+        
+        Falls back to other providers only until the first chunk is sent;
+        usage_info is filled in once the stream completes.
+        """
+        routing_strategy = strategy or self.default_strategy
+        
+        available_providers = self._get_available_providers(model)
+        if not available_providers:
+            raise ValueError(f"No available providers for model {model}")
+        
+        primary_provider = self._select_provider(
+            model,
+            available_providers,
+            routing_strategy,
+            user_preferences
+        )
+        providers_to_try = [primary_provider]
+        providers_to_try.extend(p for p in available_providers if p != primary_provider)
+        
+        last_error = None
+        
+        for provider_name in providers_to_try:
+            connector = self.llm_manager.get_connector(provider_name)
+            if not connector:
+                continue
+            
+            started = False
+            start_time = datetime.utcnow()
+            try:
+                async for text in connector.stream_chat_completion(
+                    messages=messages,
+                    model=model,
+                    usage_info=usage_info,
+                    **kwargs
+                ):
+                    started = True
+                    yield text
+            except Exception as e:
+                logger.warning(f"Provider {provider_name} failed for model {model}: {e}")
+                self._update_provider_stats(provider_name, success=False)
+                if started:
+                    raise
+                last_error = e
+                continue
+            
+            latency = (datetime.utcnow() - start_time).total_seconds() * 1000
+            self._update_provider_stats(provider_name, success=True, latency=latency)
+            
+            usage_info['provider'] = provider_name
+            usage_info['routing_strategy'] = self.default_strategy.value
+            
+            logger.debug("Successfully streamed request from %s for model %s", provider_name, model)
+            return
+        
+        logger.error(f"All providers failed for model {model}")
+        raise Exception(f"All providers failed. Last error: {last_error}")
+    
     def _get_available_providers(self, model: str) -> List[str]:
         """Get list of available providers for a model"""
         available = []
@@ -334,7 +402,7 @@ class LLMRequestRouter:
                 usage_info['provider'] = provider_name
                 usage_info['routing_strategy'] = self.default_strategy.value
                 
-                logger.info(f"Successfully routed request to {provider_name} for model {model}")
+                logger.debug("Successfully routed request to %s for model %s", provider_name, model)
                 return response, usage_info
                 
             except Exception as e:
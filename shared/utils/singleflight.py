@@ -0,0 +1,37 @@
+"""
+Single-flight request coalescing for WaddleAI
+Collapses concurrent identical lookups (quota checks, credential
+verification) into one execution whose result every caller shares
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one execution"""
+    
+    def __init__(self, on_coalesced: Optional[Callable[[], None]] = None):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._on_coalesced = on_coalesced
+    
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn for key, or join the call already in flight for it
+        
+        The shared call runs as its own task, so a caller being cancelled
+        does not cancel the work other callers are waiting on.
+        """
+        task = self._inflight.get(key)
+        if task is not None:
+            if self._on_coalesced:
+                self._on_coalesced()
+        else:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _, key=key: self._inflight.pop(key, None))
+        
+        return await asyncio.shield(task)
+    
+    def inflight(self) -> int:
+        """Number of keys with a call in flight"""
+        return len(self._inflight)
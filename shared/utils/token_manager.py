@@ -3,10 +3,13 @@ WaddleAI Dual Token System
 Manages both WaddleAI tokens (normalized) and raw LLM tokens with conversion rates
 """
 
-import json
-from typing import Dict, Tuple, Optional, Any
+import orjson
+import queue
+import threading
+import time
+from typing import Dict, List, Tuple, Optional, Any
 from datetime import datetime, date, timedelta
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from enum import Enum
 import tiktoken
 import logging
@@ -42,11 +45,157 @@ class ConversionRate:
     base_cost_per_waddleai_token: float
 
 
+def _merge_breakdown(target: Dict[str, Dict[str, int]], source: Dict[str, Dict[str, int]]):
+    """Add per-model input/output counts from source into target"""
+    for model_key, tokens in source.items():
+        if model_key in target:
+            target[model_key]["input"] += tokens["input"]
+            target[model_key]["output"] += tokens["output"]
+        else:
+            target[model_key] = dict(tokens)
+
+
+def _load_breakdown(value) -> Dict[str, Dict[str, int]]:
+    """Read a stored per-model breakdown
+    
+    The json fields hold the dict itself; rows written before that hold a
+    JSON string inside the json field and are decoded once more.
+    """
+    if not value:
+        return {}
+    if isinstance(value, (str, bytes)):
+        return orjson.loads(value)
+    return value
+
+
+# Providers with dedicated token_usage counters; others live only in llm_tokens
+COLUMN_PROVIDERS = ('openai', 'anthropic', 'ollama')
+
+
+def _provider_token_columns(breakdown: Dict[str, Dict[str, int]]) -> Dict[str, int]:
+    """Sum a per-model breakdown into tokens_<provider>_input/output columns"""
+    columns: Dict[str, int] = {}
+    for model_key, tokens in breakdown.items():
+        provider = model_key.split('_', 1)[0]
+        if provider in COLUMN_PROVIDERS:
+            for direction in ('input', 'output'):
+                column = f"tokens_{provider}_{direction}"
+                columns[column] = columns.get(column, 0) + tokens[direction]
+    return columns
+
+
+def summarize_usage(db, query, recent_limit: int = 50) -> Dict[str, Any]:
+    """Aggregate the token_usage rows matching query in the database
+    
+    Rows hold one API key's usage for one day, so days group on the date
+    column, requests sum request_count, and providers come from the
+    tokens_<provider>_input/output columns.
+    """
+    usage = db.token_usage
+    tokens_sum = usage.waddleai_tokens.sum()
+    requests_sum = usage.request_count.sum()
+    provider_sums = {
+        (provider, direction): usage[f"tokens_{provider}_{direction}"].sum()
+        for provider in COLUMN_PROVIDERS
+        for direction in ('input', 'output')
+    }
+    
+    daily_rows = db(query).select(
+        usage.date, tokens_sum, requests_sum, groupby=usage.date, orderby=usage.date
+    )
+    provider_row = db(query).select(*provider_sums.values()).first()
+    # Only the most recent records are returned in full, oldest first
+    recent_records = db(query).select(orderby=~usage.date | ~usage.id, limitby=(0, recent_limit))
+    
+    daily_usage = {
+        row[usage.date].isoformat(): {
+            'tokens': row[tokens_sum] or 0,
+            'requests': row[requests_sum] or 0
+        }
+        for row in daily_rows
+    }
+    provider_usage = {
+        provider: {
+            'input_tokens': provider_row[provider_sums[provider, 'input']] or 0,
+            'output_tokens': provider_row[provider_sums[provider, 'output']] or 0
+        }
+        for provider in COLUMN_PROVIDERS
+    }
+    
+    return {
+        "total_tokens": sum(stats['tokens'] for stats in daily_usage.values()),
+        "total_requests": sum(stats['requests'] for stats in daily_usage.values()),
+        "daily_usage": daily_usage,
+        "provider_usage": provider_usage,
+        "recent_usage": recent_records.as_list()[::-1]
+    }
+
+
+class UsageWriter:
+    """Background thread that applies usage records in batches
+    
+    Requests only enqueue their usage; the thread drains up to max_batch
+    items or max_delay seconds' worth, hands them to write_batch in one
+    call and commits once, so DB round trips and commits are shared by
+    every request in the batch.
+    """
+    
+    def __init__(self, db, write_batch, max_batch: int = 500, max_delay: float = 0.05):
+        self.db = db
+        self.write_batch = write_batch
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue: queue.Queue = queue.Queue()
+        self._stop = object()
+        self._thread = threading.Thread(target=self._run, name='usage-writer', daemon=True)
+    
+    def start(self):
+        self._thread.start()
+    
+    def submit(self, item):
+        """Queue one usage record for the next batch"""
+        self._queue.put(item)
+    
+    def close(self, timeout: float = 10.0):
+        """Write everything already queued, then stop the thread"""
+        self._queue.put(self._stop)
+        self._thread.join(timeout)
+    
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            if self._stop in batch:
+                stopping = True
+                batch = [item for item in batch if item is not self._stop]
+            if batch:
+                self._write(batch)
+    
+    def _write(self, batch: List[Any]):
+        try:
+            self.write_batch(batch)
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Failed to write {len(batch)} usage records: {e}")
+
+
 class TokenManager:
     """Manages token counting, conversion, and quota enforcement"""
     
     def __init__(self, db):
         self.db = db
+        self.writer: Optional[UsageWriter] = None
         self._load_conversion_rates()
         
         # Initialize token encoders for different providers
@@ -140,13 +289,19 @@ class TokenManager:
         model: str,
         api_key_id: int,
         user_id: int,
-        organization_id: int
+        organization_id: int,
+        actual_input_tokens: Optional[int] = None,
+        actual_output_tokens: Optional[int] = None
     ) -> TokenUsage:
-        """Process token usage for a request"""
+        """Process token usage for a request
+        
+        Counts reported by the provider are used as-is; the text is only
+        tokenized when a count is missing.
+        """
         
         # Count LLM tokens
-        input_tokens = self.count_tokens(input_text, provider, model)
-        output_tokens = self.count_tokens(output_text, provider, model)
+        input_tokens = actual_input_tokens or self.count_tokens(input_text, provider, model)
+        output_tokens = actual_output_tokens or self.count_tokens(output_text, provider, model)
         
         # Convert to WaddleAI tokens
         waddleai_tokens = self.calculate_waddleai_tokens(input_tokens, output_tokens, provider, model)
@@ -172,11 +327,52 @@ class TokenManager:
             cost_estimate_usd=cost_usd
         )
         
-        # Update database
-        self._update_usage_records(usage, api_key_id, user_id, organization_id, provider, model)
+        # Update database, or leave it to the batching writer when running
+        if self.writer is not None:
+            self.writer.submit((usage, api_key_id, user_id, organization_id))
+        else:
+            self._update_usage_records(usage, api_key_id, user_id, organization_id, provider, model)
         
         return usage
     
+    def start_writer(self, max_batch: int = 500, max_delay: float = 0.05):
+        """Batch usage writes on a background thread from now on"""
+        if self.writer is None:
+            self.writer = UsageWriter(self.db, self._write_usage_batch, max_batch, max_delay)
+            self.writer.start()
+    
+    def stop_writer(self):
+        """Flush queued usage and go back to writing inline"""
+        writer, self.writer = self.writer, None
+        if writer is not None:
+            writer.close()
+    
+    def _write_usage_batch(self, batch):
+        """Coalesce queued usage per API key and apply each total once"""
+        totals: Dict[Tuple[int, int, int], List[Any]] = {}
+        for usage, api_key_id, user_id, organization_id in batch:
+            key = (api_key_id, user_id, organization_id)
+            total = totals.get(key)
+            if total is None:
+                # Copy, since the caller still holds the original usage
+                breakdown = {k: dict(v) for k, v in usage.llm_tokens_breakdown.items()}
+                totals[key] = [replace(usage, llm_tokens_breakdown=breakdown), 1]
+                continue
+            
+            merged = total[0]
+            merged.waddleai_tokens += usage.waddleai_tokens
+            merged.llm_tokens_input += usage.llm_tokens_input
+            merged.llm_tokens_output += usage.llm_tokens_output
+            merged.cost_estimate_waddleai += usage.cost_estimate_waddleai
+            merged.cost_estimate_usd += usage.cost_estimate_usd
+            _merge_breakdown(merged.llm_tokens_breakdown, usage.llm_tokens_breakdown)
+            total[1] += 1
+        
+        for (api_key_id, user_id, organization_id), (usage, requests) in totals.items():
+            self._update_usage_records(
+                usage, api_key_id, user_id, organization_id, None, None, requests=requests
+            )
+    
     def _update_usage_records(
         self,
         usage: TokenUsage,
@@ -184,10 +380,12 @@ class TokenManager:
         user_id: int,
         organization_id: int,
         provider: str,
-        model: str
+        model: str,
+        requests: int = 1
     ):
-        """Update usage records in database"""
+        """Update usage records in database; usage may total several requests"""
         today = date.today()
+        provider_tokens = _provider_token_columns(usage.llm_tokens_breakdown)
         
         # Update daily usage record
         existing = self.db(
@@ -202,21 +400,22 @@ class TokenManager:
             new_output = existing.tokens_output_total + usage.llm_tokens_output
             
             # Merge LLM token breakdowns
-            existing_breakdown = json.loads(existing.llm_tokens) if existing.llm_tokens else {}
-            for model_key, tokens in usage.llm_tokens_breakdown.items():
-                if model_key in existing_breakdown:
-                    existing_breakdown[model_key]["input"] += tokens["input"]
-                    existing_breakdown[model_key]["output"] += tokens["output"]
-                else:
-                    existing_breakdown[model_key] = tokens
+            existing_breakdown = _load_breakdown(existing.llm_tokens)
+            _merge_breakdown(existing_breakdown, usage.llm_tokens_breakdown)
+            
+            provider_totals = {
+                column: (existing[column] or 0) + count
+                for column, count in provider_tokens.items()
+            }
             
             existing.update_record(
                 waddleai_tokens=new_waddleai,
                 tokens_input_total=new_input,
                 tokens_output_total=new_output,
-                llm_tokens=json.dumps(existing_breakdown),
-                request_count=existing.request_count + 1,
-                last_updated=datetime.utcnow()
+                llm_tokens=existing_breakdown,
+                request_count=existing.request_count + requests,
+                last_updated=datetime.utcnow(),
+                **provider_totals
             )
         else:
             # Create new record
@@ -228,14 +427,21 @@ class TokenManager:
                 waddleai_tokens=usage.waddleai_tokens,
                 tokens_input_total=usage.llm_tokens_input,
                 tokens_output_total=usage.llm_tokens_output,
-                llm_tokens=json.dumps(usage.llm_tokens_breakdown),
-                request_count=1
+                llm_tokens=usage.llm_tokens_breakdown,
+                request_count=requests,
+                **provider_tokens
             )
         
         # Update cache for quota checking
-        self._update_usage_cache(usage, api_key_id, organization_id)
+        self._update_usage_cache(usage, api_key_id, organization_id, requests)
     
-    def _update_usage_cache(self, usage: TokenUsage, api_key_id: int, organization_id: int):
+    def _update_usage_cache(
+        self,
+        usage: TokenUsage,
+        api_key_id: int,
+        organization_id: int,
+        requests: int = 1
+    ):
         """Update real-time usage cache for quota enforcement"""
         now = datetime.utcnow()
         today = now.replace(hour=0, minute=0, second=0, microsecond=0)
@@ -252,18 +458,13 @@ class TokenManager:
             new_waddleai = daily_cache.waddleai_tokens_used + usage.waddleai_tokens
             
             # Update LLM token breakdown
-            llm_tokens = json.loads(daily_cache.llm_tokens_used) if daily_cache.llm_tokens_used else {}
-            for model_key, tokens in usage.llm_tokens_breakdown.items():
-                if model_key in llm_tokens:
-                    llm_tokens[model_key]["input"] += tokens["input"]
-                    llm_tokens[model_key]["output"] += tokens["output"]
-                else:
-                    llm_tokens[model_key] = tokens
+            llm_tokens = _load_breakdown(daily_cache.llm_tokens_used)
+            _merge_breakdown(llm_tokens, usage.llm_tokens_breakdown)
             
             daily_cache.update_record(
                 waddleai_tokens_used=new_waddleai,
-                llm_tokens_used=json.dumps(llm_tokens),
-                requests_made=daily_cache.requests_made + 1,
+                llm_tokens_used=llm_tokens,
+                requests_made=daily_cache.requests_made + requests,
                 last_updated=now
             )
         else:
@@ -273,8 +474,8 @@ class TokenManager:
                 period='daily',
                 period_start=today,
                 waddleai_tokens_used=usage.waddleai_tokens,
-                llm_tokens_used=json.dumps(usage.llm_tokens_breakdown),
-                requests_made=1
+                llm_tokens_used=usage.llm_tokens_breakdown,
+                requests_made=requests
             )
         
         # Update monthly cache
@@ -288,18 +489,13 @@ class TokenManager:
             new_waddleai = monthly_cache.waddleai_tokens_used + usage.waddleai_tokens
             
             # Update LLM token breakdown
-            llm_tokens = json.loads(monthly_cache.llm_tokens_used) if monthly_cache.llm_tokens_used else {}
-            for model_key, tokens in usage.llm_tokens_breakdown.items():
-                if model_key in llm_tokens:
-                    llm_tokens[model_key]["input"] += tokens["input"]
-                    llm_tokens[model_key]["output"] += tokens["output"]
-                else:
-                    llm_tokens[model_key] = tokens
+            llm_tokens = _load_breakdown(monthly_cache.llm_tokens_used)
+            _merge_breakdown(llm_tokens, usage.llm_tokens_breakdown)
             
             monthly_cache.update_record(
                 waddleai_tokens_used=new_waddleai,
-                llm_tokens_used=json.dumps(llm_tokens),
-                requests_made=monthly_cache.requests_made + 1,
+                llm_tokens_used=llm_tokens,
+                requests_made=monthly_cache.requests_made + requests,
                 last_updated=now
             )
         else:
@@ -309,8 +505,8 @@ class TokenManager:
                 period='monthly',
                 period_start=month_start,
                 waddleai_tokens_used=usage.waddleai_tokens,
-                llm_tokens_used=json.dumps(usage.llm_tokens_breakdown),
-                requests_made=1
+                llm_tokens_used=usage.llm_tokens_breakdown,
+                requests_made=requests
             )
     
     def check_quota(self, api_key_id: int) -> Tuple[bool, Dict[str, Any]]:
@@ -422,7 +618,7 @@ class TokenManager:
             
             # LLM model breakdown
             if record.llm_tokens:
-                llm_data = json.loads(record.llm_tokens)
+                llm_data = _load_breakdown(record.llm_tokens)
                 for model, tokens in llm_data.items():
                     if model not in stats["llm_breakdown"]:
                         stats["llm_breakdown"][model] = {"input": 0, "output": 0}
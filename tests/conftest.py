@@ -3,6 +3,7 @@ Pytest configuration and shared fixtures for WaddleAI tests
 """
 
 import pytest
+import itertools
 import tempfile
 import os
 import shutil
@@ -14,7 +15,7 @@ import sys
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from shared.database.models import get_db
-from shared.auth.rbac import RBACManager, Role, UserContext
+from shared.auth.rbac import RBACManager, Role, UserContext, ROLE_PERMISSIONS
 
 
 @pytest.fixture
@@ -59,8 +60,9 @@ def sample_user_context():
         username="testuser",
         role=Role.USER,
         organization_id=1,
-        api_key_id=1,
-        permissions=["user:read"]
+        managed_orgs=frozenset(),
+        permissions=ROLE_PERMISSIONS[Role.USER],
+        api_key_id=1
     )
 
 
@@ -72,8 +74,9 @@ def admin_user_context():
         username="admin",
         role=Role.ADMIN,
         organization_id=1,
-        api_key_id=2,
-        permissions=["admin:*"]
+        managed_orgs=frozenset(),
+        permissions=ROLE_PERMISSIONS[Role.ADMIN],
+        api_key_id=2
     )
 
 
@@ -83,6 +86,17 @@ def rbac_manager(mock_db):
     return RBACManager(mock_db, "test-secret")
 
 
+@pytest.fixture
+def api_key_record(mock_db):
+    """API key row on mock_db; lookups return the key, then its owner, repeatedly"""
+    key_record = Mock(id=7, user_id=1, key_hash="hashed_key")
+    key_owner = Mock(id=1, username="testuser", role="user",
+                     organization_id=1, managed_orgs=None, enabled=True)
+    mock_db.return_value = Mock()
+    mock_db.return_value.select.return_value.first.side_effect = itertools.cycle([key_record, key_owner])
+    return key_record
+
+
 @pytest.fixture
 def sample_messages():
     """Sample chat messages for testing"""
@@ -0,0 +1,76 @@
+"""
+Unit tests for the HS256 JWT signer
+"""
+
+import base64
+import pytest
+import jwt
+import orjson
+import time
+from datetime import datetime, timedelta
+
+from shared.auth.jwt_hs256 import (
+    HS256Signer, InvalidTokenError, ExpiredSignatureError, decode_unverified
+)
+
+
+class TestHS256Signer:
+    """Test HS256 token encoding and verification"""
+    
+    def test_round_trip(self):
+        """Test a signed payload decodes back unchanged"""
+        signer = HS256Signer("test-secret")
+        token = signer.encode({"user_id": 1, "exp": int(time.time()) + 60})
+        
+        assert signer.decode(token)["user_id"] == 1
+        assert decode_unverified(token)["user_id"] == 1
+    
+    def test_constant_header(self):
+        """Test the precomputed header matches the encoded HS256 header"""
+        token = HS256Signer("test-secret").encode({"user_id": 1})
+        header = token.split(".")[0]
+        
+        assert header == "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9"
+        assert orjson.loads(base64.urlsafe_b64decode(header + "=" * (-len(header) % 4))) == {
+            "alg": "HS256", "typ": "JWT"
+        }
+    
+    def test_datetime_claims(self):
+        """Test datetime time claims are encoded as epoch seconds"""
+        signer = HS256Signer("test-secret")
+        token = signer.encode({"exp": datetime.utcnow() + timedelta(hours=1)})
+        
+        assert isinstance(decode_unverified(token)["exp"], int)
+    
+    def test_pyjwt_compatible(self):
+        """Test tokens interoperate with PyJWT in both directions"""
+        signer = HS256Signer("test-secret")
+        
+        token = signer.encode({"user_id": 1})
+        assert jwt.decode(token, "test-secret", algorithms=["HS256"])["user_id"] == 1
+        
+        token = jwt.encode({"user_id": 2}, "test-secret", algorithm="HS256")
+        assert signer.decode(token)["user_id"] == 2
+    
+    def test_wrong_secret(self):
+        """Test tokens signed with another secret are rejected"""
+        token = HS256Signer("other-secret").encode({"user_id": 1})
+        
+        with pytest.raises(InvalidTokenError):
+            HS256Signer("test-secret").decode(token)
+    
+    def test_expired(self):
+        """Test expired tokens raise ExpiredSignatureError"""
+        signer = HS256Signer("test-secret")
+        token = signer.encode({"user_id": 1, "exp": int(time.time()) - 1})
+        
+        with pytest.raises(ExpiredSignatureError):
+            signer.decode(token)
+    
+    def test_malformed(self):
+        """Test malformed tokens raise InvalidTokenError"""
+        signer = HS256Signer("test-secret")
+        
+        for token in ("invalid.token.here", "not-a-token", "a.b.c.d", "é.é.é"):
+            with pytest.raises(InvalidTokenError):
+                signer.decode(token)
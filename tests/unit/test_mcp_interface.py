@@ -405,6 +405,64 @@ class TestMCPServer:
         assert "metrics" in result
         assert result["status"] == "healthy"
 
+    @pytest.mark.asyncio
+    async def test_handle_message_batch(self, mock_db, sample_user_context):
+        """Test JSON-RPC batch is answered in a single frame"""
+        rbac_manager = Mock()
+        request_router = Mock()
+
+        server = MCPServer(rbac_manager, request_router, mock_db)
+        websocket = AsyncMock()
+
+        batch = [
+            {"jsonrpc": "2.0", "id": 1, "method": "initialize"},
+            {"jsonrpc": "2.0", "id": 2, "method": "tools/list"},
+            {"jsonrpc": "2.0", "id": 3, "method": "unknown/method"}
+        ]
+        await server._handle_message(websocket, json.dumps(batch), sample_user_context)
+
+        websocket.send.assert_called_once()
+        responses = json.loads(websocket.send.call_args[0][0])
+        assert [r["id"] for r in responses] == [1, 2, 3]
+        assert "serverInfo" in responses[0]["result"]
+        assert "tools" in responses[1]["result"]
+        assert responses[2]["error"]["code"] == -32601
+
+    @pytest.mark.asyncio
+    async def test_handle_message_batch_notifications(self, mock_db, sample_user_context):
+        """Test notifications in a JSON-RPC batch get no response"""
+        server = MCPServer(Mock(), Mock(), mock_db)
+        websocket = AsyncMock()
+
+        batch = [
+            {"jsonrpc": "2.0", "method": "notifications/initialized"},
+            {"jsonrpc": "2.0", "id": 1, "method": "tools/list"}
+        ]
+        await server._handle_message(websocket, json.dumps(batch), sample_user_context)
+
+        responses = json.loads(websocket.send.call_args[0][0])
+        assert [r["id"] for r in responses] == [1]
+
+        websocket.reset_mock()
+        notifications = [
+            {"jsonrpc": "2.0", "method": "notifications/initialized"},
+            {"jsonrpc": "2.0", "method": "notifications/cancelled"}
+        ]
+        await server._handle_message(websocket, json.dumps(notifications), sample_user_context)
+
+        websocket.send.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_handle_message_empty_batch(self, mock_db, sample_user_context):
+        """Test empty JSON-RPC batch is rejected"""
+        server = MCPServer(Mock(), Mock(), mock_db)
+        websocket = AsyncMock()
+
+        await server._handle_message(websocket, "[]", sample_user_context)
+
+        response = json.loads(websocket.send.call_args[0][0])
+        assert response["error"]["code"] == -32600
+
 
 class TestMCPServerFactory:
     """Test MCP server factory function"""
@@ -0,0 +1,41 @@
+"""
+Unit tests for database model setup
+"""
+
+import pytest
+
+from shared.database.models import get_db, define_indexes, INDEXES
+
+
+class TestDefineIndexes:
+    """Test secondary index creation against a real SQLite database"""
+    
+    @pytest.fixture
+    def db(self):
+        db = get_db('sqlite:memory', pool_size=0, migrate=True)
+        yield db
+        db.close()
+    
+    def index_names(self, db):
+        return {row[0] for row in db.executesql("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    
+    def test_indexes_created(self, db):
+        """Test every listed index exists after get_db"""
+        expected = {f"idx_{table}_{'_'.join(fields)}" for table, fields in INDEXES}
+        
+        assert expected <= self.index_names(db)
+    
+    def test_define_indexes_idempotent(self, db):
+        """Test running define_indexes again skips existing indexes"""
+        before = self.index_names(db)
+        
+        define_indexes(db)
+        
+        assert self.index_names(db) == before
+    
+    def test_define_indexes_unknown_column(self, db, monkeypatch):
+        """Test a misspelled column is reported rather than skipped"""
+        monkeypatch.setattr('shared.database.models.INDEXES', [('users', ('usrname',))])
+        
+        with pytest.raises(AttributeError):
+            define_indexes(db)
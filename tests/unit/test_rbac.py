@@ -8,7 +8,8 @@ from datetime import datetime, timedelta
 from unittest.mock import Mock, patch
 
 from shared.auth.rbac import RBACManager, Role, Permission, UserContext
-from shared.auth.rbac import AuthenticationError, AuthorizationError
+from shared.auth.rbac import AuthenticationError, AuthorizationError, permission_mask
+from shared.auth.rbac import ROLE_PERMISSIONS, ROLE_PERMISSION_MASKS
 
 
 class TestRBACManager:
@@ -27,7 +28,7 @@ class TestRBACManager:
         
         assert hashed != password
         assert isinstance(hashed, str)
-        assert len(hashed) > 50  # Bcrypt hashes are long
+        assert hashed.startswith("$argon2id$")
     
     def test_verify_password(self, rbac_manager):
         """Test password verification"""
@@ -70,6 +71,21 @@ class TestRBACManager:
         assert verified_context.role == sample_user_context.role
         assert verified_context.organization_id == sample_user_context.organization_id
     
+    def test_verify_jwt_token_cached(self, rbac_manager, sample_user_context):
+        """Test repeated JWT verification is served from the auth cache"""
+        token = rbac_manager.generate_jwt_token(sample_user_context)
+        
+        with patch.object(rbac_manager, '_verify_jwt_token', wraps=rbac_manager._verify_jwt_token) as mock_verify:
+            first = rbac_manager.verify_jwt_token(token)
+            second = rbac_manager.verify_jwt_token(token)
+            
+            assert first is second
+            assert mock_verify.call_count == 1
+            
+            rbac_manager.invalidate_auth_cache()
+            rbac_manager.verify_jwt_token(token)
+            assert mock_verify.call_count == 2
+    
     def test_verify_jwt_token_invalid(self, rbac_manager):
         """Test JWT token verification with invalid token"""
         with pytest.raises(AuthenticationError):
@@ -126,29 +142,158 @@ class TestRBACManager:
         context = rbac_manager.authenticate_user("invaliduser", "wrongpassword")
         assert context is None
     
+    @patch('shared.auth.rbac.password_needs_rehash', return_value=False)
+    @patch('shared.auth.rbac.verify_password')
+    def test_authenticate_api_key_by_key_id(self, mock_verify, mock_needs_rehash, rbac_manager, api_key_record):
+        """Test API key lookup by embedded key_id with a single hash check"""
+        mock_verify.return_value = True
+        
+        api_key = "wa-0123abcd-se-cret"
+        context = rbac_manager.authenticate_api_key(api_key)
+        
+        assert context.api_key_id == 7
+        assert context.user_id == 1
+        mock_verify.assert_called_once_with(api_key, "hashed_key")
+    
+    @patch('shared.auth.rbac.password_needs_rehash', return_value=False)
+    @patch('shared.auth.rbac.verify_password')
+    def test_authenticate_api_key_cached(self, mock_verify, mock_needs_rehash, rbac_manager, mock_db, api_key_record):
+        """Test repeated API key auth skips hashing and writes last_used behind"""
+        mock_verify.return_value = True
+        
+        api_key = "wa-0123abcd-secret"
+        first = rbac_manager.authenticate_api_key(api_key)
+        second = rbac_manager.authenticate_api_key(api_key)
+        
+        assert first is second
+        assert mock_verify.call_count == 1
+        mock_db.return_value.update.assert_not_called()
+        
+        rbac_manager.flush_last_used()
+        mock_db.return_value.update.assert_called_once()
+    
+    @pytest.mark.asyncio
+    @patch('shared.auth.rbac.password_needs_rehash', return_value=False)
+    @patch('shared.auth.rbac.verify_password', return_value=True)
+    async def test_authenticate_api_key_async_uncached(self, mock_verify, mock_needs_rehash, rbac_manager, api_key_record):
+        """Test use_cache=False verifies every time but still records last_used"""
+        async def db_run(fn, *args):
+            return fn(*args)
+        
+        api_key = "wa-0123abcd-secret"
+        await rbac_manager.authenticate_api_key_async(api_key, db_run, use_cache=False)
+        await rbac_manager.authenticate_api_key_async(api_key, db_run, use_cache=False)
+        
+        assert mock_verify.call_count == 2
+        assert 7 in rbac_manager._pending_last_used
+    
+    @patch('shared.auth.rbac.hash_password', return_value="$argon2id$new")
+    @patch('shared.auth.rbac.verify_password', return_value=True)
+    def test_authenticate_api_key_rehashes_bcrypt(self, mock_verify, mock_hash, rbac_manager, api_key_record):
+        """Test a legacy bcrypt key hash is upgraded to argon2id on success"""
+        api_key_record.key_hash = "$2b$12$legacyhash"
+        
+        api_key = "wa-0123abcd-secret"
+        rbac_manager.authenticate_api_key(api_key)
+        
+        mock_hash.assert_called_once_with(api_key)
+        api_key_record.update_record.assert_called_once_with(key_hash="$argon2id$new")
+    
+    def test_authenticate_api_key_invalid_format(self, rbac_manager):
+        """Test malformed API keys are rejected before any lookup"""
+        with pytest.raises(AuthenticationError):
+            rbac_manager.authenticate_api_key("sk-not-a-waddle-key")
+    
     def test_check_permission_admin(self, rbac_manager, admin_user_context):
         """Test permission checking for admin user"""
         # Admin should have all permissions
-        assert rbac_manager.check_permission(admin_user_context, Permission.ADMIN_MANAGE) is True
-        assert rbac_manager.check_permission(admin_user_context, Permission.RESOURCE_MANAGE) is True
+        assert rbac_manager.check_permission(admin_user_context, Permission.SYSTEM_CONFIG) is True
+        assert rbac_manager.check_permission(admin_user_context, Permission.ORG_UPDATE) is True
         assert rbac_manager.check_permission(admin_user_context, Permission.USER_READ) is True
     
     def test_check_permission_user(self, rbac_manager, sample_user_context):
         """Test permission checking for regular user"""
         # Regular user should only have user permissions
-        assert rbac_manager.check_permission(sample_user_context, Permission.USER_READ) is True
-        assert rbac_manager.check_permission(sample_user_context, Permission.ADMIN_MANAGE) is False
-        assert rbac_manager.check_permission(sample_user_context, Permission.RESOURCE_MANAGE) is False
+        assert rbac_manager.check_permission(sample_user_context, Permission.PROXY_USE) is True
+        assert rbac_manager.check_permission(sample_user_context, Permission.SYSTEM_CONFIG) is False
+        assert rbac_manager.check_permission(sample_user_context, Permission.ORG_UPDATE) is False
+    
+    def test_check_permission_resource_scope(self, rbac_manager):
+        """Test org and user scoping follows the role's resource policy"""
+        manager = UserContext(
+            user_id=5,
+            username="manager",
+            role=Role.RESOURCE_MANAGER,
+            organization_id=1,
+            managed_orgs=frozenset({2, 3}),
+            permissions=ROLE_PERMISSIONS[Role.RESOURCE_MANAGER]
+        )
+        user = UserContext(
+            user_id=6,
+            username="user",
+            role=Role.USER,
+            organization_id=1,
+            managed_orgs=frozenset(),
+            permissions=ROLE_PERMISSIONS[Role.USER]
+        )
+        
+        assert rbac_manager.check_permission(manager, Permission.QUOTA_READ, resource_org_id=3) is True
+        assert rbac_manager.check_permission(manager, Permission.QUOTA_READ, resource_org_id=1) is False
+        assert rbac_manager.check_permission(manager, Permission.QUOTA_READ, resource_user_id=99) is True
+        
+        assert rbac_manager.check_permission(user, Permission.QUOTA_READ, resource_org_id=1) is True
+        assert rbac_manager.check_permission(user, Permission.QUOTA_READ, resource_org_id=2) is False
+        assert rbac_manager.check_permission(user, Permission.QUOTA_READ, resource_user_id=6) is True
+        assert rbac_manager.check_permission(user, Permission.QUOTA_READ, resource_user_id=7) is False
+    
+    def test_require_permission_decorator(self, rbac_manager):
+        """Test the decorator allows, denies and scopes by resource"""
+        user = UserContext(
+            user_id=6,
+            username="user",
+            role=Role.USER,
+            organization_id=1,
+            managed_orgs=frozenset(),
+            permissions=ROLE_PERMISSIONS[Role.USER]
+        )
+        
+        @rbac_manager.require_permission(Permission.QUOTA_READ)
+        def read_quota(user_context=None):
+            return "ok"
+        
+        @rbac_manager.require_permission(Permission.USER_DELETE)
+        def delete_user(user_context=None):
+            return "ok"
+        
+        @rbac_manager.require_permission(Permission.QUOTA_READ, resource_org_id=2)
+        def read_other_org_quota(user_context=None):
+            return "ok"
+        
+        assert read_quota(user_context=user) == "ok"
+        with pytest.raises(AuthorizationError):
+            delete_user(user_context=user)
+        with pytest.raises(AuthorizationError):
+            read_other_org_quota(user_context=user)
+        with pytest.raises(AuthorizationError):
+            read_quota()
     
     def test_require_permission_success(self, rbac_manager, admin_user_context):
         """Test permission requirement (success case)"""
+        @rbac_manager.require_permission(Permission.SYSTEM_CONFIG)
+        def configure(user_context=None):
+            return "ok"
+        
         # Should not raise exception
-        rbac_manager.require_permission(admin_user_context, Permission.ADMIN_MANAGE)
+        assert configure(user_context=admin_user_context) == "ok"
     
     def test_require_permission_failure(self, rbac_manager, sample_user_context):
         """Test permission requirement (failure case)"""
+        @rbac_manager.require_permission(Permission.SYSTEM_CONFIG)
+        def configure(user_context=None):
+            return "ok"
+        
         with pytest.raises(AuthorizationError):
-            rbac_manager.require_permission(sample_user_context, Permission.ADMIN_MANAGE)
+            configure(user_context=sample_user_context)
 
 
 class TestRole:
@@ -164,8 +309,8 @@ class TestRole:
     def test_role_hierarchy(self):
         """Test role hierarchy"""
         # Admin should have highest privileges
-        admin_perms = set(Permission.get_permissions_for_role(Role.ADMIN))
-        user_perms = set(Permission.get_permissions_for_role(Role.USER))
+        admin_perms = set(ROLE_PERMISSIONS[Role.ADMIN])
+        user_perms = set(ROLE_PERMISSIONS[Role.USER])
         
         # Admin permissions should include all user permissions
         assert user_perms.issubset(admin_perms)
@@ -176,24 +321,24 @@ class TestPermission:
     
     def test_permission_values(self):
         """Test permission enum values"""
-        assert Permission.ADMIN_MANAGE.value == "admin:manage"
-        assert Permission.RESOURCE_MANAGE.value == "resource:manage"
+        assert Permission.SYSTEM_CONFIG.value == "system:config"
+        assert Permission.ORG_UPDATE.value == "org:update"
         assert Permission.USER_READ.value == "user:read"
     
     def test_get_permissions_for_role(self):
         """Test getting permissions for each role"""
-        admin_perms = Permission.get_permissions_for_role(Role.ADMIN)
-        assert Permission.ADMIN_MANAGE in admin_perms
-        assert Permission.RESOURCE_MANAGE in admin_perms
+        admin_perms = ROLE_PERMISSIONS[Role.ADMIN]
+        assert Permission.SYSTEM_CONFIG in admin_perms
+        assert Permission.ORG_UPDATE in admin_perms
         assert Permission.USER_READ in admin_perms
         
-        user_perms = Permission.get_permissions_for_role(Role.USER)
-        assert Permission.ADMIN_MANAGE not in user_perms
-        assert Permission.USER_READ in user_perms
+        user_perms = ROLE_PERMISSIONS[Role.USER]
+        assert Permission.SYSTEM_CONFIG not in user_perms
+        assert Permission.PROXY_USE in user_perms
         
-        resource_manager_perms = Permission.get_permissions_for_role(Role.RESOURCE_MANAGER)
-        assert Permission.RESOURCE_MANAGE in resource_manager_perms
-        assert Permission.ADMIN_MANAGE not in resource_manager_perms
+        resource_manager_perms = ROLE_PERMISSIONS[Role.RESOURCE_MANAGER]
+        assert Permission.ORG_UPDATE in resource_manager_perms
+        assert Permission.SYSTEM_CONFIG not in resource_manager_perms
 
 
 class TestUserContext:
@@ -229,6 +374,56 @@ class TestUserContext:
         assert context.api_key_id is None
         assert context.permissions == []
 
+    def test_user_context_perm_mask(self):
+        """Test permission bitmask is derived from the permission set"""
+        context = UserContext(
+            user_id=1,
+            username="testuser",
+            role=Role.USER,
+            organization_id=1,
+            managed_orgs=frozenset(),
+            permissions=frozenset({Permission.USER_READ, Permission.PROXY_USE})
+        )
+        
+        assert context.perm_mask == permission_mask({Permission.USER_READ, Permission.PROXY_USE})
+        assert context.has_permission(Permission.USER_READ) is True
+        assert context.has_permission(Permission.PROXY_USE) is True
+        assert context.has_permission(Permission.USER_DELETE) is False
+    
+    def test_user_context_shares_role_permissions(self):
+        """Test contexts built from the role table reuse its frozen set and mask"""
+        context = UserContext(
+            user_id=1,
+            username="testuser",
+            role=Role.REPORTER,
+            organization_id=1,
+            managed_orgs=frozenset(),
+            permissions=ROLE_PERMISSIONS[Role.REPORTER]
+        )
+        
+        assert isinstance(context.permissions, frozenset)
+        assert context.permissions is ROLE_PERMISSIONS[Role.REPORTER]
+        assert context.perm_mask == ROLE_PERMISSION_MASKS[Role.REPORTER]
+        assert context.perm_mask == permission_mask(ROLE_PERMISSIONS[Role.REPORTER])
+    
+    def test_user_context_immutable(self):
+        """Test cached contexts cannot be modified in place"""
+        context = UserContext(
+            user_id=1,
+            username="testuser",
+            role=Role.USER,
+            organization_id=1,
+            managed_orgs=frozenset({2}),
+            permissions=ROLE_PERMISSIONS[Role.USER]
+        )
+        
+        with pytest.raises(AttributeError):
+            context.role = Role.ADMIN
+        with pytest.raises(AttributeError):
+            context.managed_orgs = frozenset()
+        
+        assert not hasattr(context, "__dict__")
+
 
 class TestExceptions:
     """Test custom exceptions"""
@@ -0,0 +1,67 @@
+"""
+Unit tests for single-flight request coalescing
+"""
+
+import asyncio
+import pytest
+from unittest.mock import Mock
+
+from shared.utils.singleflight import SingleFlight
+
+
+class TestSingleFlight:
+    """Test SingleFlight coalescing"""
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_coalesced(self):
+        """Test concurrent calls for one key share a single execution"""
+        on_coalesced = Mock()
+        singleflight = SingleFlight(on_coalesced=on_coalesced)
+        calls = 0
+        
+        async def lookup():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "result"
+        
+        results = await asyncio.gather(*(singleflight.do("quota:1", lookup) for _ in range(5)))
+        
+        assert results == ["result"] * 5
+        assert calls == 1
+        assert on_coalesced.call_count == 4
+        assert singleflight.inflight() == 0
+    
+    @pytest.mark.asyncio
+    async def test_distinct_keys_not_coalesced(self):
+        """Test calls for different keys run independently"""
+        singleflight = SingleFlight()
+        
+        async def lookup(value):
+            await asyncio.sleep(0.01)
+            return value
+        
+        results = await asyncio.gather(
+            singleflight.do("quota:1", lambda: lookup(1)),
+            singleflight.do("quota:2", lambda: lookup(2))
+        )
+        
+        assert results == [1, 2]
+    
+    @pytest.mark.asyncio
+    async def test_exception_shared(self):
+        """Test every waiting caller sees the shared call's exception"""
+        singleflight = SingleFlight()
+        
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise ValueError("lookup failed")
+        
+        results = await asyncio.gather(
+            singleflight.do("key", failing),
+            singleflight.do("key", failing),
+            return_exceptions=True
+        )
+        
+        assert all(isinstance(result, ValueError) for result in results)
+        assert singleflight.inflight() == 0
@@ -4,11 +4,12 @@ Unit tests for token management system
 
 import pytest
 from unittest.mock import Mock, patch
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 
+from shared.database.models import get_db
 from shared.utils.token_manager import (
     TokenManager, TokenUsage, WaddleAITokenCalculator,
-    create_token_manager
+    create_token_manager, summarize_usage
 )
 
 
@@ -340,6 +341,64 @@ class TestTokenManager:
         assert stats["provider_breakdown"] == {}
 
 
+class TestSummarizeUsage:
+    """Test usage aggregation against a real SQLite database"""
+    
+    @pytest.fixture
+    def usage_db(self):
+        db = get_db('sqlite:memory', pool_size=0, migrate=True)
+        org_id = db.organizations.insert(name='acme')
+        user_id = db.users.insert(
+            username='alice', email='alice@example.com', password_hash='x',
+            role='user', organization_id=org_id
+        )
+        key_id = db.api_keys.insert(
+            key_id='0123abcd', key_hash='x', user_id=user_id,
+            organization_id=org_id, name='test'
+        )
+        today = date.today()
+        for days_ago, tokens, requests, openai_in in [(0, 100, 2, 40), (0, 50, 1, 10), (1, 70, 3, 0), (40, 999, 9, 999)]:
+            db.token_usage.insert(
+                api_key_id=key_id, user_id=user_id, organization_id=org_id,
+                date=today - timedelta(days=days_ago), waddleai_tokens=tokens,
+                request_count=requests, tokens_openai_input=openai_in,
+                tokens_anthropic_output=tokens // 10
+            )
+        yield db
+        db.close()
+    
+    def test_summarize_usage(self, usage_db):
+        """Test totals group by day and providers come from the token columns"""
+        usage = usage_db.token_usage
+        today = date.today()
+        
+        stats = summarize_usage(usage_db, usage.date > today - timedelta(days=30))
+        
+        assert stats["total_tokens"] == 220
+        assert stats["total_requests"] == 6
+        assert stats["daily_usage"] == {
+            (today - timedelta(days=1)).isoformat(): {'tokens': 70, 'requests': 3},
+            today.isoformat(): {'tokens': 150, 'requests': 3}
+        }
+        assert stats["provider_usage"]["openai"] == {'input_tokens': 50, 'output_tokens': 0}
+        assert stats["provider_usage"]["anthropic"] == {'input_tokens': 0, 'output_tokens': 22}
+        assert stats["provider_usage"]["ollama"] == {'input_tokens': 0, 'output_tokens': 0}
+        assert [record['date'] for record in stats["recent_usage"]] == [
+            today - timedelta(days=1), today, today
+        ]
+    
+    def test_summarize_usage_no_data(self, usage_db):
+        """Test an empty period sums to zero"""
+        usage = usage_db.token_usage
+        
+        stats = summarize_usage(usage_db, usage.date > date.today())
+        
+        assert stats["total_tokens"] == 0
+        assert stats["daily_usage"] == {}
+        assert stats["provider_usage"]["openai"] == {'input_tokens': 0, 'output_tokens': 0}
+        assert stats["recent_usage"] == []
+
+
 class TestTokenManagerFactory:
     """Test token manager factory function"""
     